@@ -9,10 +9,11 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.db.models import BooleanField, F, Func
 from django.db.models.functions import Coalesce, Random
-from django.http import HttpRequest, HttpResponseRedirect
-from django.template.response import SimpleTemplateResponse
+from django.http import HttpRequest, HttpResponseRedirect, StreamingHttpResponse
+from django.template.loader import get_template
 from django.templatetags.static import static
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
@@ -49,6 +50,7 @@ from ..models.activities import (
 )
 from ..models.courses import CourseRegistration
 from ..models.events import EventRegistration
+from ..models.leprikonsite import site_defaults_scope
 from ..models.orderables import OrderableRegistration
 from ..models.utils import lazy_help_text_with_html_default
 from ..utils import amount_color, attributes, currency
@@ -62,6 +64,7 @@ from .filters import (
     CanceledListFilter,
     IsNullFieldListFilter,
     LeaderListFilter,
+    NotPaidListFilter,
     SchoolYearListFilter,
 )
 from .messages import SendMessageAdminMixin
@@ -70,6 +73,8 @@ from .settings import ChildModelAdmin, ParentAdminMixin
 from .transaction import TransactionAdminMixin, TransactionBaseAdmin, TransactionTypeListFilter
 from .utils import datetime_with_by
 
+INVOICES_XML_CHUNK_SIZE = 200
+
 
 class IsNull(Func):
     _output_field = BooleanField()
@@ -815,6 +820,7 @@ class RegistrationBaseAdmin(AdminExportMixin, SendMailAdminMixin, SendMessageAdm
         "activity__organization",
         ApprovedListFilter,
         CanceledListFilter,
+        NotPaidListFilter,
         "registration_link",
         ("billing_info", IsNullFieldListFilter),
         "activity__groups",
@@ -857,6 +863,7 @@ class RegistrationBaseAdmin(AdminExportMixin, SendMailAdminMixin, SendMessageAdm
             "participants__birth_date",
             "participants__birth_num",
             "participants__first_name",
+            "participants__identity_key",
             "participants__last_name",
         ) or super().lookup_allowed(lookup, value)
 
@@ -883,6 +890,10 @@ class RegistrationBaseAdmin(AdminExportMixin, SendMailAdminMixin, SendMessageAdm
                     ]
                 )
 
+            def get_results(self, request):
+                super().get_results(request)
+                self.model.prefetch_other_registrations_counts(self.result_list)
+
         return ChangeList
 
     def get_queryset(self, request):
@@ -891,6 +902,7 @@ class RegistrationBaseAdmin(AdminExportMixin, SendMailAdminMixin, SendMessageAdm
             .get_queryset(request)
             .prefetch_related(
                 "discounts",
+                "participants",
                 "received_payments",
                 "returned_payments",
             )
@@ -953,10 +965,37 @@ class RegistrationBaseAdmin(AdminExportMixin, SendMailAdminMixin, SendMessageAdm
 
     @attributes(short_description=_("Export selected registrations as invoices in XML"))
     def export_invoices_xml(self, request, queryset):
-        response = SimpleTemplateResponse("leprikon/invoices.xml", {"registrations": queryset}, content_type="text/xml")
+        response = StreamingHttpResponse(self.iter_invoices_xml(queryset), content_type="text/xml")
         response["Content-Disposition"] = 'attachment; filename="invoices.xml"'
         return response
 
+    def iter_invoices_xml(self, queryset):
+        """
+        Generate the XML document with one FaktVyd element per registration with requested payment.
+        The registrations are loaded in chunks with all the data needed, so that the memory usage
+        and the number of queries per chunk are constant.
+        """
+        registration_ids = list(
+            queryset.filter(payment_requested__isnull=False).order_by("id").values_list("id", flat=True)
+        )
+        now = timezone.localtime()
+        yield '\ufeff<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield f'<MoneyData ExpDate="{now:%Y-%m-%d}" ExpTime="{now:%H:%M:%S}">\n'
+        yield "    <SeznamFaktVyd>\n"
+        template = get_template("leprikon/invoice.xml")
+        # streaming continues after the request has been processed
+        with site_defaults_scope():
+            for i in range(0, len(registration_ids), INVOICES_XML_CHUNK_SIZE):
+                for registration in (
+                    self.model.objects.filter(id__in=registration_ids[i : i + INVOICES_XML_CHUNK_SIZE])
+                    .order_by("id")
+                    .with_payment_status_data()
+                    .select_related("activity", "approved_by", "billing_info", "user")
+                    .prefetch_related("participants")
+                ):
+                    yield template.render({"registration": registration})
+        yield "    </SeznamFaktVyd>\n</MoneyData>\n"
+
     @attributes(short_description=_("Cancel selected registrations"))
     def cancel(self, request, queryset):
         for registration in queryset.all():
@@ -1183,6 +1222,7 @@ class RegistrationAdmin(AdminExportMixin, SendMessageAdminMixin, ChangeformRedir
         ("activity__activity_type", ActivityTypeListFilter),
         ApprovedListFilter,
         CanceledListFilter,
+        NotPaidListFilter,
         ("activity", ActivityListFilter),
         ("activity__leaders", LeaderListFilter),
     )
@@ -1206,9 +1246,23 @@ class RegistrationAdmin(AdminExportMixin, SendMessageAdminMixin, ChangeformRedir
             "participants__birth_date",
             "participants__birth_num",
             "participants__first_name",
+            "participants__identity_key",
             "participants__last_name",
         ) or super().lookup_allowed(lookup, value)
 
+    def get_changelist(self, request, **kwargs):
+        ChangeListBase = super().get_changelist(request, **kwargs)
+
+        class ChangeList(ChangeListBase):
+            def get_results(self, request):
+                super().get_results(request)
+                self.model.prefetch_other_registrations_counts(self.result_list)
+
+        return ChangeList
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("activity").prefetch_related("participants")
+
     def get_model_perms(self, request):
         return {}
 
@@ -10,7 +10,9 @@ from django.utils.translation import gettext_lazy as _
 
 from ..forms.courses import CourseDiscountAdminForm, CourseRegistrationAdminForm
 from ..models.activities import ActivityModel
+from ..models.balance import update_registrations_cached_balance
 from ..models.courses import Course, CourseDiscount, CourseRegistration
+from ..models.rollover import copy_activities_to_school_year
 from ..models.schoolyear import SchoolYear, SchoolYearDivision
 from ..utils import attributes, currency
 from .activities import ActivityBaseAdmin, ActivityDiscountBaseAdmin, RegistrationBaseAdmin
@@ -81,13 +83,27 @@ class CourseAdmin(ActivityBaseAdmin):
                 help_text=_("All selected courses will be copied to selected school year."),
                 queryset=SchoolYear.objects.all(),
             )
+            dry_run = forms.BooleanField(
+                label=_("Dry run"),
+                help_text=_("Only check that the selected courses can be copied, do not save any changes."),
+                required=False,
+            )
 
         if request.POST.get("post", "no") == "yes":
             form = SchoolYearForm(request.POST)
             if form.is_valid():
                 school_year = form.cleaned_data["school_year"]
-                for course in queryset.all():
-                    course.copy_to_school_year(school_year)
+                if form.cleaned_data["dry_run"]:
+                    copied = copy_activities_to_school_year(queryset.all(), school_year, dry_run=True)
+                    self.message_user(
+                        request,
+                        _("{count} courses would be copied to school year {school_year}.").format(
+                            count=len(copied),
+                            school_year=school_year,
+                        ),
+                    )
+                    return
+                copy_activities_to_school_year(queryset.all(), school_year)
                 self.message_user(request, _("Selected courses were copied to school year {}.").format(school_year))
                 return
         else:
@@ -202,6 +218,8 @@ class CourseRegistrationAdmin(PdfExportAdminMixin, RegistrationBaseAdmin):
                         period__in=form.cleaned_data[f"periods_{registration.activity_variant.school_year_division_id}"]
                     )
                 )
+                # bulk_create does not send post_save signal updating the balance
+                update_registrations_cached_balance(queryset.values_list("id", flat=True))
                 self.message_user(request, _("The discounts have been created for selected registrations."))
                 return
         else:
@@ -82,6 +82,18 @@ class ApprovedListFilter(admin.SimpleListFilter):
             return queryset.filter(approved__isnull=True)
 
 
+class NotPaidListFilter(admin.SimpleListFilter):
+    title = _("payment status")
+    parameter_name = "not_paid"
+
+    def lookups(self, request, model_admin):
+        return (("yes", _("not paid")),)
+
+    def queryset(self, request, queryset):
+        if self.value() == "yes":
+            return queryset.not_paid()
+
+
 class CanceledListFilter(admin.SimpleListFilter):
     title = _("cancelation")
     parameter_name = "canceled"
@@ -9,7 +9,9 @@ from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 
 from ..models.activities import ActivityModel
+from ..models.balance import update_registrations_cached_balance
 from ..models.orderables import Orderable, OrderableDiscount, OrderableRegistration
+from ..models.rollover import copy_activities_to_school_year
 from ..models.schoolyear import SchoolYear
 from ..utils import attributes, currency
 from .activities import ActivityBaseAdmin, ActivityDiscountBaseAdmin, RegistrationBaseAdmin
@@ -80,13 +82,27 @@ class OrderableAdmin(ActivityBaseAdmin):
                 help_text=_("All selected orderable events will be copied to selected school year."),
                 queryset=SchoolYear.objects.all(),
             )
+            dry_run = forms.BooleanField(
+                label=_("Dry run"),
+                help_text=_("Only check that the selected orderable events can be copied, do not save any changes."),
+                required=False,
+            )
 
         if request.POST.get("post", "no") == "yes":
             form = SchoolYearForm(request.POST)
             if form.is_valid():
                 school_year = form.cleaned_data["school_year"]
-                for orderable in queryset.all():
-                    orderable.copy_to_school_year(school_year)
+                if form.cleaned_data["dry_run"]:
+                    copied = copy_activities_to_school_year(queryset.all(), school_year, dry_run=True)
+                    self.message_user(
+                        request,
+                        _("{count} orderable events would be copied to school year {school_year}.").format(
+                            count=len(copied),
+                            school_year=school_year,
+                        ),
+                    )
+                    return
+                copy_activities_to_school_year(queryset.all(), school_year)
                 self.message_user(
                     request,
                     _("Selected orderable events were copied to school year {}.").format(school_year),
@@ -157,6 +173,8 @@ class OrderableRegistrationAdmin(PdfExportAdminMixin, RegistrationBaseAdmin):
                     )
                     for registration in queryset.all()
                 )
+                # bulk_create does not send post_save signal updating the balance
+                update_registrations_cached_balance(queryset.values_list("id", flat=True))
                 self.message_user(request, _("The discounts have been created for selected registrations."))
                 return
         else:
@@ -5,7 +5,6 @@ from django.urls import path, reverse
 from django.utils.safestring import mark_safe
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
-from pypdf import PdfReader, PdfWriter
 
 from ..utils import attributes
 
@@ -16,6 +15,8 @@ class PdfExportAdminMixin:
 
     @attributes(short_description=_("Export selected items in single PDF"))
     def export_pdf(self, request, queryset):
+        from pypdf import PdfReader, PdfWriter
+
         # create PDF
         writer = PdfWriter()
         for obj in queryset.iterator():
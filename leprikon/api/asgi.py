@@ -0,0 +1,76 @@
+"""
+ASGI application serving the read-heavy calendar endpoints without the shared sync thread.
+
+Under ASGI, Django runs all the sync code (middleware and views) of all the requests in a single thread
+of the process, so that many concurrent calendar polls would block the other requests (e.g. form submissions).
+This application handles the calendar requests with a short middleware chain and runs the whole chain
+(including the view) in a bounded thread pool of its own.
+The shared thread is only used to send the request_started and request_finished signals.
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.db import close_old_connections
+from django.urls import resolve
+from django.utils.module_loading import import_string
+
+from ..conf import settings
+
+CALENDAR_PATHS = re.compile(r"^/api/(activity/[^/.]+/(unavailable_dates|business_hours)|calendarexport/[^/.]+/ical)$")
+
+# the middleware needed by the calendar endpoints (in the same order as in MIDDLEWARE)
+MIDDLEWARE = [
+    "leprikon.middleware.LeprikonInstrumentationMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.middleware.locale.LocaleMiddleware",
+    "leprikon.middleware.LeprikonMiddleware",
+]
+
+
+def is_calendar_path(path: str) -> bool:
+    return CALENDAR_PATHS.match(path) is not None
+
+
+def get_response(request):
+    resolver_match = resolve(request.path_info)
+    request.resolver_match = resolver_match
+    response = resolver_match.func(request, *resolver_match.args, **resolver_match.kwargs)
+    if hasattr(response, "render"):
+        response = response.render()
+    return response
+
+
+class CalendarASGIHandler(ASGIHandler):
+    def __init__(self):
+        super().__init__()
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.LEPRIKON_API_ASYNC_WORKERS, thread_name_prefix="leprikon-api"
+        )
+
+    def load_middleware(self, is_async=False):
+        handler = convert_exception_to_response(get_response)
+        for middleware_path in reversed(MIDDLEWARE):
+            try:
+                handler = convert_exception_to_response(import_string(middleware_path)(handler))
+            except MiddlewareNotUsed:
+                pass
+        self._middleware_chain = handler
+
+    def get_response(self, request):
+        # the threads of the pool live longer than the requests, so their connections are closed like in sync threads
+        close_old_connections()
+        try:
+            return super().get_response(request)
+        finally:
+            close_old_connections()
+
+    async def get_response_async(self, request):
+        return await sync_to_async(self.get_response, thread_sensitive=False, executor=self.executor)(request)
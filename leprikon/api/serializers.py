@@ -56,6 +56,11 @@ class GetBusinessHoursSerializer(serializers.Serializer):
     end = serializers.DateField()
 
 
+class HoldTimeslotSerializer(serializers.Serializer):
+    start_date = serializers.DateField()
+    start_time = serializers.TimeField()
+
+
 class BusinessHoursSerializer(serializers.Serializer):
     days_of_week = serializers.ListField()
     start_time = serializers.CharField()
@@ -17,9 +17,10 @@ from leprikon.conf import settings
 from leprikon.models.calendar import CalendarExport
 from leprikon.utils.calendar import TimeSlot, end_time_format, start_time_format
 
-from ..models.activities import ActivityVariant, CalendarEvent
+from ..models.activities import ActivityModel, ActivityVariant, CalendarEvent
 from ..models.journals import Journal
 from ..models.schoolyear import SchoolYear
+from ..utils.metrics import API_REQUEST_SECONDS
 from .serializers import (
     ActivitySerializer,
     BusinessHoursSerializer,
@@ -28,6 +29,7 @@ from .serializers import (
     CredentialsSerializer,
     GetBusinessHoursSerializer,
     GetUnavailableDatesSerializer,
+    HoldTimeslotSerializer,
     RegistrationParticipantSerializer,
     SchoolYearSerializer,
     SetSchoolYearSerializer,
@@ -129,6 +131,12 @@ class ActivityViewSet(viewsets.ReadOnlyModelViewSet):
         """Override get_object() type, which is guessed to be Never"""
         return super().get_object()
 
+    def get_orderable_variant(self) -> ActivityVariant:
+        activity_variant = self.get_object()
+        if activity_variant.activity.activity_type.model != ActivityModel.ORDERABLE:
+            raise NotFound
+        return activity_variant
+
     @extend_schema(
         operation_id="unavailable_dates",
         request=None,
@@ -140,11 +148,12 @@ class ActivityViewSet(viewsets.ReadOnlyModelViewSet):
         ],
     )
     @action(detail=True, permission_classes=[IsAuthenticated])
+    @API_REQUEST_SECONDS.time(endpoint="unavailable_dates")
     def unavailable_dates(self, request: Request, pk: str):
         """
         Returns a list of full day calendar events for days when the activity variant is not available.
         """
-        activity_variant: ActivityVariant = self.get_object()
+        activity_variant = self.get_orderable_variant()
         input_serializer = GetUnavailableDatesSerializer(data=request.query_params)
         input_serializer.is_valid(raise_exception=True)
         start_date: date = input_serializer.validated_data["start"].date()
@@ -152,6 +161,7 @@ class ActivityViewSet(viewsets.ReadOnlyModelViewSet):
         available_timeslots = activity_variant.get_available_timeslots(
             start_date=start_date,
             end_date=end_date,
+            user_id=request.user.id,
         )
 
         def date_range(start_date: date, end_date: date) -> Iterator[date]:
@@ -197,11 +207,12 @@ class ActivityViewSet(viewsets.ReadOnlyModelViewSet):
         detail=True,
         permission_classes=[IsAuthenticated],
     )
+    @API_REQUEST_SECONDS.time(endpoint="business_hours")
     def business_hours(self, request: Request, pk: str):
         """
         Returns a list of calendar events that use the same resources as the activity variant.
         """
-        activity_variant: ActivityVariant = self.get_object()
+        activity_variant = self.get_orderable_variant()
         input_serializer = GetBusinessHoursSerializer(data=request.query_params)
         input_serializer.is_valid(raise_exception=True)
 
@@ -223,6 +234,7 @@ class ActivityViewSet(viewsets.ReadOnlyModelViewSet):
             for raw_timeslot in activity_variant.get_available_timeslots(
                 input_serializer.validated_data["start"],
                 input_serializer.validated_data["end"] - timedelta(days=1),
+                request.user.id,
             )
             for timeslot in split_multidate_timeslot(raw_timeslot)
         ]
@@ -241,6 +253,28 @@ class ActivityViewSet(viewsets.ReadOnlyModelViewSet):
             ).data
         )
 
+    @extend_schema(
+        operation_id="hold",
+        request=HoldTimeslotSerializer,
+        responses={204: None, 404: None, 409: None},
+        methods=["post"],
+    )
+    @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated])
+    def hold(self, request: Request, pk: str):
+        """
+        Temporarily holds the selected timeslot for the user filling in the registration form.
+        """
+        activity_variant = self.get_orderable_variant()
+        input_serializer = HoldTimeslotSerializer(data=request.data)
+        input_serializer.is_valid(raise_exception=True)
+        start = datetime.combine(
+            input_serializer.validated_data["start_date"],
+            input_serializer.validated_data["start_time"],
+        )
+        if activity_variant.hold_timeslot(request.user.id, start):
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(status=status.HTTP_409_CONFLICT)
+
 
 class CalendarEventViewSet(viewsets.ModelViewSet):
     serializer_class = CalendarEventSerializer
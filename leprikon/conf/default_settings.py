@@ -126,7 +126,67 @@ LEPRIKON_URL_EMAIL = "email"
 
 LEPRIKON_MENU_ADD_LOGOUT = True
 
-LEPRIKON_SITE_CACHE_MAX_AGE = 5
+# the site is cached in each process until it (or related data) changes, but at most for this number of seconds
+LEPRIKON_SITE_CACHE_MAX_AGE = 60
+
+# reject registrations exceeding activity capacity (instead of accepting them as unapproved)
+LEPRIKON_REGISTRATION_ENFORCE_CAPACITY = False
+
+# max number of registration forms being submitted at the same time (None means no limit)
+# and number of seconds after which the slot of a request is released (longer than any submission takes)
+LEPRIKON_REGISTRATION_ADMISSION_LIMIT = None
+LEPRIKON_REGISTRATION_ADMISSION_TIMEOUT = 60
+
+# number of seconds to hold the selected orderable timeslot for the user filling in the registration form
+LEPRIKON_ORDERABLE_HOLD_TIMEOUT = None
+
+# the current school year is cached for this number of seconds (or until any school year changes)
+LEPRIKON_SCHOOL_YEAR_CACHE_TIMEOUT = 60 * 60
+
+# rendered activity list plugins are cached for this number of seconds (or until any activity changes)
+LEPRIKON_ACTIVITY_LIST_CACHE_TIMEOUT = 60
+
+# report results are cached for this number of seconds (or until any data changes)
+LEPRIKON_REPORT_CACHE_TIMEOUT = 60 * 60
+# compute reports in background threads (requires cache shared by all the processes)
+LEPRIKON_REPORT_ASYNC = False
+# max number of seconds to compute a report and the refresh interval of the page shown meanwhile
+# (a report is considered failed if its process does not report progress for three refresh intervals)
+LEPRIKON_REPORT_TIMEOUT = 60 * 10
+LEPRIKON_REPORT_REFRESH_INTERVAL = 3
+
+# html snippets included with the upstream template tag are refreshed in background once older than max age
+# and they are dropped once older than stale max age (number of seconds)
+LEPRIKON_UPSTREAM_MAX_AGE = 60
+LEPRIKON_UPSTREAM_STALE_MAX_AGE = 60 * 60 * 24
+LEPRIKON_UPSTREAM_TIMEOUT = 5
+
+# collect per request timings of SQL queries, templates, PDFs, QR codes and mails,
+# send them to staff users in the Server-Timing header and log requests slower than the threshold (seconds)
+LEPRIKON_INSTRUMENTATION = False
+LEPRIKON_SLOW_REQUEST_THRESHOLD = 2
+# share of the slow requests to be logged (0.0 - 1.0)
+LEPRIKON_SLOW_REQUEST_SAMPLE_RATE = 1.0
+
+# number of seconds between checks of the cron job schedules and max number of jobs running at the same time
+# in the long running scheduler (leprikon runscheduler)
+LEPRIKON_SCHEDULER_INTERVAL = 60
+LEPRIKON_SCHEDULER_WORKERS = 4
+
+# max number of threads computing the async calendar API responses (availability, business hours and iCal export)
+LEPRIKON_API_ASYNC_WORKERS = 4
+
+# load views, translations, static files manifest, templates and the current site before serving requests
+# (used with gunicorn --preload to share them between the workers)
+LEPRIKON_WARM_UP = False
+
+# expose application metrics in the Prometheus text format at /metrics
+LEPRIKON_METRICS = False
+# directory shared by all the processes (e.g. gunicorn workers) of a single host to store their metrics
+# (None keeps them in memory), it contains one file per running process and one with metrics of finished ones
+LEPRIKON_METRICS_DIR = None
+# if set, the metrics are only served with header "Authorization: Bearer <token>"
+LEPRIKON_METRICS_TOKEN = None
 
 # expression to create variable symbol (activity.code + last two digits of year + last four digits of id)
 LEPRIKON_VARIABLE_SYMBOL_EXPRESSION = (
@@ -3,13 +3,46 @@ from itertools import chain
 from traceback import print_exc
 
 from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
 from django.utils.translation import override
 from django_cron import CronJobBase, Schedule
+from django_cron.backends.lock.base import DjangoCronJobLock
+from django_cron.models import CronJobLock
 from sentry_sdk import capture_exception
 
 from .models.courses import CourseRegistrationPeriod
 from .models.events import EventRegistration
+from .models.leprikonsite import site_defaults_scope
 from .models.orderables import OrderableRegistration
+from .utils.metrics import CRON_JOB_FAILURES, CRON_JOB_SECONDS
+
+
+class DatabaseLock(DjangoCronJobLock):
+    """
+    Lock the cron job by a row lock held in a dedicated database connection while the job is running,
+    so that the job does not run in several processes (or containers) at the same time.
+    The lock is released by the database even if the process is killed.
+    """
+
+    def lock(self):
+        CronJobLock.objects.get_or_create(job_name=self.job_name)
+        self.connection = connections.create_connection(DEFAULT_DB_ALIAS)
+        self.connection.set_autocommit(False)
+        query = CronJobLock.objects.select_for_update(nowait=True).filter(job_name=self.job_name).query
+        sql, params = query.get_compiler(connection=self.connection).as_sql()
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(sql, params)
+        except DatabaseError:
+            self.release()
+            return False
+        return True
+
+    def release(self):
+        try:
+            self.connection.rollback()
+        finally:
+            self.connection.close()
 
 
 class SentryCronJobBase(CronJobBase):
@@ -18,9 +51,10 @@ class SentryCronJobBase(CronJobBase):
 
     def do(self):
         try:
-            with override(settings.LANGUAGE_CODE):
+            with override(settings.LANGUAGE_CODE), site_defaults_scope(), CRON_JOB_SECONDS.time(job=self.code):
                 return self.dojob()
         except Exception:
+            CRON_JOB_FAILURES.inc(job=self.code)
             capture_exception()
             raise
 
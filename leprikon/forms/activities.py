@@ -17,6 +17,7 @@ from sentry_sdk import capture_message
 
 from leprikon.utils.calendar import TimeSlot
 
+from ..conf import settings
 from ..models.activities import (
     Activity,
     ActivityGroup,
@@ -31,6 +32,7 @@ from ..models.activities import (
     RegistrationParticipant,
 )
 from ..models.agegroup import AgeGroup
+from ..models.balance import update_registrations_cached_balance
 from ..models.citizenship import Citizenship
 from ..models.courses import Course, CourseRegistration, CourseRegistrationPeriod
 from ..models.department import Department
@@ -387,6 +389,41 @@ class RegistrationParticipantFormMixin:
             self.instance.birth_num = None
 
 
+class RegistrationProfile:
+    """
+    Saved participants, parents, group contacts and billing information of the user,
+    loaded once for all the sub forms of the registration form.
+    """
+
+    def __init__(self, user, activity: Activity):
+        self.user = user
+        self.activity = activity
+
+    @cached_property
+    def participants(self) -> dict[int, Participant]:
+        # participants already registered to the activity are not offered
+        registered_birth_nums = RegistrationParticipant.objects.filter(
+            registration_id__in=self.activity.active_registrations.values("id"),
+            birth_num__isnull=False,
+        ).values("birth_num")
+        return {
+            participant.id: participant
+            for participant in self.user.leprikon_participants.exclude(birth_num__in=registered_birth_nums)
+        }
+
+    @cached_property
+    def parents(self) -> dict[int, Parent]:
+        return {parent.id: parent for parent in self.user.leprikon_parents.all()}
+
+    @cached_property
+    def group_contacts(self) -> dict[int, GroupContact]:
+        return {group_contact.id: group_contact for group_contact in self.user.leprikon_group_contacts.all()}
+
+    @cached_property
+    def billing_info(self) -> dict[int, BillingInfo]:
+        return {billing_info.id: billing_info for billing_info in self.user.leprikon_billing_info.all()}
+
+
 class RegistrationParticipantForm(FormMixin, RegistrationParticipantFormMixin, SchoolMixin, forms.ModelForm):
     x_group = "age_group"
 
@@ -399,6 +436,7 @@ class RegistrationParticipantForm(FormMixin, RegistrationParticipantFormMixin, S
         ),
         required=False,
     )
+    profile: RegistrationProfile
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -445,6 +483,14 @@ class RegistrationParticipantForm(FormMixin, RegistrationParticipantFormMixin, S
             dict((q.slug, q.get_field()) for q in self.activity.all_questions),
         )(**kwargs)
 
+    @property
+    def user_participants(self) -> list[Participant]:
+        return list(self.profile.participants.values())
+
+    @property
+    def user_parents(self) -> list[Parent]:
+        return list(self.profile.parents.values())
+
     @cached_property
     def media(self):
         media = Media()
@@ -502,7 +548,7 @@ class RegistrationParticipantForm(FormMixin, RegistrationParticipantFormMixin, S
             participant = Participant()
             participant.user = self.instance.registration.user
         else:
-            participant = Participant.objects.get(id=self.participant_select_form.cleaned_data["participant"])
+            participant = self.profile.participants[int(self.participant_select_form.cleaned_data["participant"])]
         for attr in [
             "first_name",
             "last_name",
@@ -533,7 +579,7 @@ class RegistrationParticipantForm(FormMixin, RegistrationParticipantFormMixin, S
                 parent = Parent()
                 parent.user = self.instance.registration.user
             else:
-                parent = Parent.objects.get(id=self.parent1_select_form.cleaned_data["parent"])
+                parent = self.profile.parents[int(self.parent1_select_form.cleaned_data["parent"])]
             for attr in ["first_name", "last_name", "street", "city", "postal_code", "phone", "email"]:
                 setattr(parent, attr, getattr(self.instance.parent1, attr))
             parent.save()
@@ -544,7 +590,7 @@ class RegistrationParticipantForm(FormMixin, RegistrationParticipantFormMixin, S
                 parent = Parent()
                 parent.user = self.instance.registration.user
             else:
-                parent = Parent.objects.get(id=self.parent2_select_form.cleaned_data["parent"])
+                parent = self.profile.parents[int(self.parent2_select_form.cleaned_data["parent"])]
             for attr in ["first_name", "last_name", "street", "city", "postal_code", "phone", "email"]:
                 setattr(parent, attr, getattr(self.instance.parent2, attr))
             parent.save()
@@ -563,6 +609,7 @@ class RegistrationGroupForm(FormMixin, SchoolMixin, forms.ModelForm):
         ),
         required=False,
     )
+    profile: RegistrationProfile
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -593,6 +640,10 @@ class RegistrationGroupForm(FormMixin, SchoolMixin, forms.ModelForm):
             dict((q.slug, q.get_field()) for q in self.activity.all_questions),
         )(**kwargs)
 
+    @property
+    def user_group_contacts(self) -> list[GroupContact]:
+        return list(self.profile.group_contacts.values())
+
     @cached_property
     def media(self):
         media = Media()
@@ -634,7 +685,9 @@ class RegistrationGroupForm(FormMixin, SchoolMixin, forms.ModelForm):
             group_contact = GroupContact()
             group_contact.user = self.instance.registration.user
         else:
-            group_contact = GroupContact.objects.get(id=self.group_contact_select_form.cleaned_data["group_contact"])
+            group_contact = self.profile.group_contacts[
+                int(self.group_contact_select_form.cleaned_data["group_contact"])
+            ]
         for attr in [
             "target_group",
             "name",
@@ -677,26 +730,14 @@ class RegistrationForm(FormMixin, forms.ModelForm):
         self.user = user
         self.instance.activity = activity
         self.instance.activity_variant = activity_variant
+        self.profile = RegistrationProfile(user, activity)
 
         # sub forms
         if activity.registration_type_participants:
-            registered_birth_nums = list(
-                RegistrationParticipant.objects.filter(
-                    registration_id__in=self.instance.activity.active_registrations.values("id"),
-                    birth_num__isnull=False,
-                ).values_list("birth_num", flat=True)
-            )
-
             participant_form = type(
                 RegistrationParticipantForm.__name__,
                 (RegistrationParticipantForm,),
-                {
-                    "activity": activity,
-                    "user_participants": user.leprikon_participants.exclude(
-                        birth_num__in=registered_birth_nums,
-                    ),
-                    "user_parents": list(user.leprikon_parents.all()),
-                },
+                {"activity": activity, "profile": self.profile},
             )
 
             self.participants_formset = inlineformset_factory(
@@ -718,7 +759,7 @@ class RegistrationForm(FormMixin, forms.ModelForm):
             GroupForm = type(
                 RegistrationGroupForm.__name__,
                 (RegistrationGroupForm,),
-                {"activity": activity, "user_group_contacts": user.leprikon_group_contacts.all()},
+                {"activity": activity, "profile": self.profile},
             )
 
             self.group_formset = inlineformset_factory(
@@ -776,7 +817,7 @@ class RegistrationForm(FormMixin, forms.ModelForm):
             AgreementForm = type(str("AgreementForm"), (FormMixin, forms.Form), form_attributes)
             self.agreement_forms.append(AgreementForm(**kwargs))
 
-        self.user_billing_info = list(self.user.leprikon_billing_info.all())
+        self.user_billing_info = list(self.profile.billing_info.values())
 
         class BillingInfoSelectForm(FormMixin, forms.Form):
             billing_info = forms.ChoiceField(
@@ -871,6 +912,10 @@ class RegistrationForm(FormMixin, forms.ModelForm):
         # set price
         self.instance.price = self.instance.activity_variant.get_price(self.instance.participants_count)
 
+        # check capacity with the activity locked to prevent concurrent overbooking
+        if settings.LEPRIKON_REGISTRATION_ENFORCE_CAPACITY:
+            self.instance.activity.reserve_capacity()
+
         # create
         super().save(True)
 
@@ -910,7 +955,9 @@ class RegistrationForm(FormMixin, forms.ModelForm):
                 billing_info = BillingInfo()
                 billing_info.user = self.instance.user
             else:
-                billing_info = BillingInfo.objects.get(id=self.billing_info_select_form.cleaned_data["billing_info"])
+                billing_info = self.profile.billing_info[
+                    int(self.billing_info_select_form.cleaned_data["billing_info"])
+                ]
             for attr in [
                 "name",
                 "street",
@@ -927,7 +974,8 @@ class RegistrationForm(FormMixin, forms.ModelForm):
             billing_info.save()
 
         self.instance.generate_variable_symbol_and_slug()
-        self.instance.send_mail()
+        # do not keep the transaction (and possible locks) open while sending the mail
+        transaction.on_commit(self.instance.send_mail)
         return self.instance
 
 
@@ -978,6 +1026,8 @@ class CourseRegistrationForm(RegistrationForm):
             )
             for period in self.cleaned_data.get("periods", self.available_periods)
         )
+        # bulk_create does not send post_save signal updating the balance
+        update_registrations_cached_balance([self.instance.id])
         return self.instance
 
 
@@ -1019,13 +1069,17 @@ class OrderableRegistrationForm(RegistrationForm):
             start = datetime.combine(self.cleaned_data["start_date"], self.cleaned_data["start_time"])
             end: datetime = start + self.instance.activity.orderable.duration
             timeslot = TimeSlot(start=start, end=end)
-            conflicting_timeslots = self.instance.activity_variant.get_conflicting_timeslots(start.date(), end.date())
+            conflicting_timeslots = self.instance.activity_variant.get_conflicting_timeslots(
+                start.date(), end.date(), self.user.id
+            )
             if timeslot & conflicting_timeslots:
                 self.add_error("start_time", _("This time is not available."))
         return self.cleaned_data
 
     @transaction.atomic
     def save(self, commit=True):
+        # serialize concurrent bookings of the same resources
+        self.instance.activity_variant.lock_resources()
         start = datetime.combine(self.cleaned_data["start_date"], self.cleaned_data["start_time"])
         end: datetime = start + self.instance.activity.orderable.duration
         self.instance.calendar_event = CalendarEvent.objects.create(
@@ -1041,6 +1095,10 @@ class OrderableRegistrationForm(RegistrationForm):
         )
         self.instance.calendar_event.resources.set(self.instance.activity_variant.required_resources.all())
         self.instance.calendar_event.resource_groups.set(self.instance.activity_variant.required_resource_groups.all())
+        # with the resources locked, only the booked timeslot needs to be checked again
+        if self.instance.calendar_event.has_conflicting_events():
+            raise ValidationError(_("The selected time is no longer available."))
+        self.instance.activity_variant.release_timeslot(self.user.id)
         return super().save()
 
 
@@ -29,6 +29,7 @@ class CourseStatsForm(FormMixin, forms.Form):
         help_text=_("Count only participants attending at most this number of hours weekly."),
         required=False,
     )
+    csv = forms.BooleanField(label=_("Download as CSV"), required=False)
 
     def __init__(self, *args, **kwargs):
         school_year = kwargs.pop("school_year")
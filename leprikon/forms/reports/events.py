@@ -29,6 +29,7 @@ class EventStatsForm(FormMixin, forms.Form):
         help_text=_("Count only participants attending events that last at least this number of days."),
         required=False,
     )
+    csv = forms.BooleanField(label=_("Download as CSV"), required=False)
 
     def __init__(self, *args, **kwargs):
         school_year = kwargs.pop("school_year")
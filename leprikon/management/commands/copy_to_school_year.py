@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models.courses import Course
+from ...models.events import Event
+from ...models.orderables import Orderable
+from ...models.rollover import copy_activities_to_school_year
+from ...models.schoolyear import SchoolYear
+
+
+class Command(BaseCommand):
+    help = "Copy activities (courses, events and orderable events) from one school year to another."
+
+    def add_arguments(self, parser):
+        parser.add_argument("source_year", type=int, help="year of the source school year, e.g. 2024 for 2024/2025")
+        parser.add_argument("target_year", type=int, help="year of the target school year")
+        parser.add_argument(
+            "--activity-type",
+            action="append",
+            dest="activity_types",
+            metavar="SLUG",
+            help="copy only activities of given activity type (may be used repeatedly)",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="roll back all the changes at the end")
+
+    def handle(self, source_year, target_year, activity_types, dry_run, **options):
+        try:
+            source = SchoolYear.objects.get(year=source_year)
+            target = SchoolYear.objects.get(year=target_year)
+        except SchoolYear.DoesNotExist as e:
+            raise CommandError(e)
+        if source == target:
+            raise CommandError("Source and target school years must differ.")
+
+        activities = []
+        for model in (Course, Event, Orderable):
+            qs = model.objects.filter(school_year=source)
+            if activity_types:
+                qs = qs.filter(activity_type__slug__in=activity_types)
+            activities.extend(qs)
+
+        def progress(done, total):
+            self.stdout.write(f"\r{done}/{total}", ending="")
+            self.stdout.flush()
+
+        copied = copy_activities_to_school_year(activities, target, dry_run=dry_run, progress=progress)
+        self.stdout.write("")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(copied)} activities {'would be' if dry_run else 'were'} copied from {source} to {target}."
+            )
+        )
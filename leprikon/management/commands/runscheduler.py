@@ -0,0 +1,86 @@
+import signal
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django_cron import CronJobManager, get_class
+from django_cron.management.commands.runcrons import clear_old_log_entries
+from django_cron.models import CronJobLog
+
+from ...conf import settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the cron jobs from CRON_CLASSES on their schedules in a long running process. "
+        "Each job runs at most MAX_CONCURRENT_RUNS times at once (1 by default) within the process, "
+        "and jobs are locked by the DJANGO_CRON_LOCK_BACKEND across processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("cron_classes", nargs="*", help="cron classes to run (defaults to CRON_CLASSES)")
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=settings.LEPRIKON_SCHEDULER_INTERVAL,
+            help="number of seconds between checks of the schedules",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.LEPRIKON_SCHEDULER_WORKERS,
+            help="max number of jobs running at the same time",
+        )
+        parser.add_argument("--status", action="store_true", help="show the last run of each job and exit")
+
+    def handle(self, cron_classes, interval, workers, status, **options):
+        try:
+            self.cron_classes = [get_class(name) for name in cron_classes or settings.CRON_CLASSES]
+        except ImportError as e:
+            raise CommandError(e)
+
+        if status:
+            return self.print_status()
+
+        self.stopped = Event()
+        self.lock = Lock()
+        self.running = Counter()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: self.stopped.set())
+
+        self.stdout.write(f"Scheduling {len(self.cron_classes)} jobs every {interval} seconds")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="leprikon-cron") as executor:
+            while not self.stopped.is_set():
+                for cron_class in self.cron_classes:
+                    with self.lock:
+                        if self.running[cron_class] >= getattr(cron_class, "MAX_CONCURRENT_RUNS", 1):
+                            continue
+                        self.running[cron_class] += 1
+                    executor.submit(self.run_job, cron_class)
+                clear_old_log_entries()
+                connection.close()
+                self.stopped.wait(interval)
+            self.stdout.write("Waiting for the running jobs to finish")
+        self.stdout.write("Scheduler stopped")
+
+    def run_job(self, cron_class):
+        try:
+            # the manager checks the schedule, locks the job and logs the result (including errors)
+            with CronJobManager(cron_class, silent=True) as manager:
+                manager.run()
+        finally:
+            connection.close()
+            with self.lock:
+                self.running[cron_class] -= 1
+
+    def print_status(self):
+        for cron_class in self.cron_classes:
+            last_run = CronJobLog.objects.filter(code=cron_class.code).order_by("-start_time").first()
+            if last_run is None:
+                self.stdout.write(f"{cron_class.code}: never run")
+                continue
+            duration = (last_run.end_time - last_run.start_time).total_seconds()
+            result = self.style.SUCCESS("success") if last_run.is_success else self.style.ERROR("failure")
+            self.stdout.write(f"{cron_class.code}: {result} at {last_run.start_time} taking {duration:.1f} seconds")
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...models.activities import Registration
+from ...models.balance import get_balance_drifts, update_cached_balances
+from ...models.schoolyear import SchoolYear
+from ...utils import currency
+
+
+class Command(BaseCommand):
+    help = "Recompute stored payment balances of registrations and report those, which were out of date."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "years",
+            nargs="*",
+            type=int,
+            metavar="year",
+            help="year of the school year, e.g. 2024 for 2024/2025 (defaults to all school years)",
+        )
+        parser.add_argument("--check", action="store_true", help="only report the differences without fixing them")
+
+    def handle(self, years, check, **options):
+        registrations = Registration.objects.all()
+        if years:
+            school_years = list(SchoolYear.objects.filter(year__in=years))
+            if len(school_years) != len(set(years)):
+                raise CommandError("Some of the school years do not exist.")
+            registrations = registrations.filter(activity__school_year__in=school_years)
+
+        if check:
+            drifts = list(get_balance_drifts(registrations))
+        else:
+            with transaction.atomic():
+                drifts = update_cached_balances(registrations)
+
+        for drift in drifts:
+            self.stdout.write(
+                f"{drift.registration.variable_symbol} {drift.registration}: "
+                f"{currency(drift.cached_balance)} != {currency(drift.balance)}"
+            )
+        style = self.style.WARNING if drifts and check else self.style.SUCCESS
+        self.stdout.write(
+            style(f"{len(drifts)} registrations {'have out of date' if check else 'had updated'} payment balance.")
+        )
+        if drifts and check:
+            raise CommandError("Stored payment balances are not consistent.", returncode=2)
@@ -1,13 +1,20 @@
+import logging
+from random import random
+from time import perf_counter
+
 from django.contrib.auth.views import redirect_to_login
-from django.core.exceptions import PermissionDenied
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
 from django.urls import reverse_lazy
 
 from . import __version__
 from .conf import settings
-from .models.leprikonsite import LeprikonSite
+from .models.leprikonsite import LeprikonSite, site_defaults_scope
 from .models.roles import Leader
 from .models.schoolyear import SchoolYear
 from .models.useragreement import UserAgreement
+from .utils.instrumentation import get_request_metrics, request_metrics_scope
+
+logger = logging.getLogger(__name__)
 
 
 class school_year:
@@ -47,6 +54,11 @@ class LeprikonMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
+        # resolve the site defaults only once per request
+        with site_defaults_scope():
+            return self.handle(request)
+
+    def handle(self, request):
         # add school_year property to request
         type(request).school_year = school_year()
 
@@ -112,3 +124,38 @@ class LeprikonMiddleware:
                 login_url=self.user_login_url,
                 redirect_field_name=settings.LEPRIKON_PARAM_BACK,
             )
+
+
+class LeprikonInstrumentationMiddleware:
+    """
+    Collect SQL queries and timings of templates, PDFs, QR codes and mails of each request,
+    send them to staff users in the Server-Timing header and log (a sample of) slow requests.
+    """
+
+    def __init__(self, get_response):
+        if not settings.LEPRIKON_INSTRUMENTATION:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with request_metrics_scope() as metrics:
+            response = self.get_response(request)
+        user = getattr(request, "user", None)
+        if user is not None and user.is_staff:
+            response["Server-Timing"] = metrics.get_server_timing()
+        if (
+            metrics.duration >= settings.LEPRIKON_SLOW_REQUEST_THRESHOLD
+            and random() < settings.LEPRIKON_SLOW_REQUEST_SAMPLE_RATE
+        ):
+            logger.warning("Slow request %s %s\n%s", request.method, request.get_full_path(), metrics.get_report())
+        return response
+
+    def process_template_response(self, request, response):
+        metrics = get_request_metrics()
+        start = perf_counter()
+
+        def rendered(response):
+            metrics.add("template", perf_counter() - start)
+
+        response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.25 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+def set_identity_keys(apps, schema_editor):
+    RegistrationParticipant = apps.get_model("leprikon", "RegistrationParticipant")
+    participants = []
+    for participant in RegistrationParticipant.objects.only(
+        "birth_num", "birth_date", "first_name", "last_name"
+    ).iterator():
+        if participant.birth_num:
+            participant.identity_key = participant.birth_num.replace("/", "")
+        else:
+            participant.identity_key = "{}:{}:{}".format(
+                participant.birth_date,
+                participant.first_name.strip().lower(),
+                participant.last_name.strip().lower(),
+            )
+        participants.append(participant)
+    RegistrationParticipant.objects.bulk_update(participants, ["identity_key"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leprikon", "0095_activity_require_birth_number"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="registrationparticipant",
+            name="identity_key",
+            field=models.CharField(db_index=True, default="", editable=False, max_length=100),
+        ),
+        migrations.RunPython(set_identity_keys, reverse_code=migrations.RunPython.noop),
+    ]
@@ -3,6 +3,7 @@ from . import (  # noqa
     activities,
     agegroup,
     agreements,
+    balance,
     citizenship,
     courses,
     department,
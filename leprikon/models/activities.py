@@ -1,6 +1,6 @@
 import colorsys
 import logging
-from collections import namedtuple
+from collections import defaultdict, namedtuple
 from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 from email.mime.image import MIMEImage
@@ -9,16 +9,18 @@ from itertools import chain
 from json import dumps, loads
 from os.path import basename
 from tempfile import NamedTemporaryFile
-from typing import TYPE_CHECKING, List, Set, Union
+from typing import TYPE_CHECKING, Dict, Iterable, List, Set, Union
 from urllib.parse import urlencode
 
-import segno
 from bankreader.models import Transaction as BankreaderTransaction
+from cms.models import CMSPlugin
 from cms.models.fields import PageField
 from cms.models.pagemodel import Page
 from cms.signals.apphook import set_restart_trigger
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import models, transaction
+from django.db.models.functions import Coalesce, Greatest
 from django.dispatch import receiver
 from django.urls import reverse
 from django.utils import timezone
@@ -45,13 +47,15 @@ from ..utils.calendar import (
     get_reverse_time_slots,
     get_time_slots_by_weekly_times,
 )
+from ..utils.instrumentation import timed
+from ..utils.metrics import BANK_TRANSACTION_SECONDS, BANK_TRANSACTIONS
 from .agegroup import AgeGroup
 from .agreements import Agreement, AgreementOption
 from .calendar import CalendarEvent, Resource, ResourceGroup
 from .citizenship import Citizenship
 from .department import Department
 from .fields import BirthNumberField, ColorField, EmailField, PostalCodeField, PriceField, UniquePageField
-from .leprikonsite import LeprikonSite
+from .leprikonsite import LeprikonSite, get_site_defaults
 from .organizations import Organization
 from .pdfmail import PdfExportAndMailMixin
 from .place import Place
@@ -66,6 +70,7 @@ from .transaction import AbstractTransaction, Transaction
 from .utils import (
     BankAccount,
     PaymentStatus,
+    SubqueryCount,
     generate_variable_symbol,
     lazy_help_text_with_html_default,
 )
@@ -393,6 +398,20 @@ class ActivityGroup(models.Model):
         )
 
 
+class ActivityQuerySet(models.QuerySet):
+    def with_preview_data(self):
+        return self.select_related("activity_type", "photo", "place").prefetch_related(
+            "activity_type__attachments",
+            "attachments",
+            "age_groups",
+            "target_groups",
+            "groups",
+            "leaders",
+            "times",
+            "variants",
+        )
+
+
 class Activity(TimesMixin, models.Model):
     PARTICIPANTS = "P"
     GROUPS = "G"
@@ -511,6 +530,11 @@ class Activity(TimesMixin, models.Model):
     text_payment_received = HTMLField(_("text: payment received"), blank=True, default="")
     text_payment_returned = HTMLField(_("text: payment returned"), blank=True, default="")
 
+    objects = ActivityQuerySet.as_manager()
+
+    # date fields shifted by the year difference when copying to another school year
+    copy_year_shifted_fields: tuple[str, ...] = ()
+
     class Meta:
         app_label = "leprikon"
         ordering = ("code", "name")
@@ -649,6 +673,19 @@ class Activity(TimesMixin, models.Model):
     def over_capapcity(self):
         return self.max_registrations_count and self.active_registrations_count > self.max_registrations_count
 
+    def reserve_capacity(self):
+        """
+        Lock the activity until the end of the current transaction
+        and make sure there is a free place for another registration.
+        """
+        if not self.max_registrations_count:
+            return
+        list(Activity.objects.select_for_update().filter(id=self.id).values_list("id", flat=True))
+        if self.active_registrations.count() >= self.max_registrations_count:
+            raise ValidationError(
+                _("The capacity of {activity} has already been filled.").format(activity=self.display_name)
+            )
+
     def get_absolute_url(self):
         return reverse(self.activity_type.slug + ":activity_detail", args=(self.id,))
 
@@ -750,6 +787,54 @@ class ActivityTime(AbstractTime):
         verbose_name_plural = _("times")
 
 
+ORDERABLE_HOLDS_SEQUENCE_KEY = "leprikon:orderable_holds"
+ORDERABLE_HOLD_CACHE_KEY = "leprikon:orderable_hold:{}"
+ORDERABLE_HOLDS_CHUNK_SIZE = 100
+
+
+def add_orderable_hold(user_id: int, event: SimpleEvent | None):
+    """
+    Store the hold (or its release if event is None) of the user under a new key.
+    Holds are never modified, so that concurrent requests can not overwrite each other's holds.
+    All holds expire after the same timeout, so once a hold is expired, all the older ones are expired too.
+    """
+    cache.add(ORDERABLE_HOLDS_SEQUENCE_KEY, 0, None)
+    try:
+        sequence = cache.incr(ORDERABLE_HOLDS_SEQUENCE_KEY)
+    except ValueError:
+        # the sequence has just been evicted
+        cache.add(ORDERABLE_HOLDS_SEQUENCE_KEY, 0, None)
+        sequence = cache.incr(ORDERABLE_HOLDS_SEQUENCE_KEY)
+    # skip keys still used by holds stored before the sequence was evicted
+    while not cache.add(
+        ORDERABLE_HOLD_CACHE_KEY.format(sequence), (user_id, event), settings.LEPRIKON_ORDERABLE_HOLD_TIMEOUT
+    ):
+        sequence = cache.incr(ORDERABLE_HOLDS_SEQUENCE_KEY)
+
+
+def get_orderable_holds() -> dict[int, SimpleEvent]:
+    if not settings.LEPRIKON_ORDERABLE_HOLD_TIMEOUT:
+        return {}
+    holds: dict[int, SimpleEvent | None] = {}
+    last = cache.get(ORDERABLE_HOLDS_SEQUENCE_KEY) or 0
+    while last > 0:
+        keys = [
+            ORDERABLE_HOLD_CACHE_KEY.format(sequence)
+            for sequence in range(last, max(last - ORDERABLE_HOLDS_CHUNK_SIZE, 0), -1)
+        ]
+        found = cache.get_many(keys)
+        for key in keys:
+            if key not in found:
+                last = 0
+                break
+            user_id, event = found[key]
+            # the latest hold (or release) of the user wins
+            holds.setdefault(user_id, event)
+        else:
+            last -= ORDERABLE_HOLDS_CHUNK_SIZE
+    return {user_id: event for user_id, event in holds.items() if event is not None}
+
+
 class ActivityVariant(models.Model):
     activity: Activity = models.ForeignKey(
         Activity, on_delete=models.CASCADE, related_name="variants", verbose_name=_("activity")
@@ -861,7 +946,7 @@ class ActivityVariant(models.Model):
     def unapproved_registrations(self):
         return self.active_registrations.filter(approved=None)
 
-    def get_conflicting_timeslots(self, start_date: date, end_date: date) -> TimeSlots:
+    def get_conflicting_timeslots(self, start_date: date, end_date: date, user_id: int | None = None) -> TimeSlots:
         if start_date > end_date:
             return TimeSlots()
         if self.min_start_date > end_date or (self.max_end_date is not None and self.max_end_date < start_date):
@@ -879,12 +964,7 @@ class ActivityVariant(models.Model):
         if start_date > end_date:
             return all_day_conflicting_timeslots
 
-        required_resource_groups = list(
-            chain(
-                ({r.id} for r in self.required_resources.all()),
-                (set(r.id for r in rg.resources.all()) for rg in self.required_resource_groups.all()),
-            )
-        )
+        required_resource_groups = list(self.resource_id_groups)
         relevant_resource_ids: set[int] = set(chain.from_iterable(required_resource_groups))
         relevant_resources = Resource.objects.filter(id__in=relevant_resource_ids).prefetch_related("availabilities")
         relevant_calendar_events_by_timeslot = CalendarEvent.objects.filter(
@@ -932,6 +1012,9 @@ class ActivityVariant(models.Model):
         # calendar events
         events.extend(event.simple_event for event in relevant_calendar_events)
 
+        # timeslots held by other users
+        events.extend(event for held_user_id, event in get_orderable_holds().items() if held_user_id != user_id)
+
         conflicting_timeslots = TimeSlots(get_conflicting_timeslots(events)) | TimeSlots(
             event.timeslot for event in blocking_events
         )
@@ -947,8 +1030,55 @@ class ActivityVariant(models.Model):
 
         return conflicting_timeslots | all_day_conflicting_timeslots
 
-    def get_available_timeslots(self, start_date: date, end_date: date) -> TimeSlots:
-        return get_reverse_time_slots(self.get_conflicting_timeslots(start_date, end_date), start_date, end_date)
+    def get_available_timeslots(self, start_date: date, end_date: date, user_id: int | None = None) -> TimeSlots:
+        return get_reverse_time_slots(
+            self.get_conflicting_timeslots(start_date, end_date, user_id), start_date, end_date
+        )
+
+    @cached_property
+    def resource_id_groups(self) -> list[set[int]]:
+        return list(
+            chain(
+                ({r.id} for r in self.required_resources.all()),
+                (set(r.id for r in rg.resources.all()) for rg in self.required_resource_groups.all()),
+            )
+        )
+
+    def lock_resources(self):
+        """
+        Lock all the resources possibly required by the variant until the end of the current transaction.
+        The resources are always locked in the same order to avoid deadlocks.
+        """
+        resource_ids = set(chain.from_iterable(self.resource_id_groups))
+        list(
+            Resource.objects.select_for_update().filter(id__in=resource_ids).order_by("id").values_list("id", flat=True)
+        )
+
+    def hold_timeslot(self, user_id: int, start: datetime) -> bool:
+        """
+        Temporarily hold the timeslot starting at given time for the user,
+        who is filling in the registration form.
+        Returns False if the timeslot is not available (or holding is disabled).
+        """
+        timeout = settings.LEPRIKON_ORDERABLE_HOLD_TIMEOUT
+        if not timeout:
+            return False
+        orderable = self.activity.orderable
+        end = start + orderable.duration
+        if TimeSlot(start=start, end=end) & self.get_conflicting_timeslots(start.date(), end.date(), user_id):
+            return False
+        add_orderable_hold(
+            user_id,
+            SimpleEvent(
+                TimeSlot(start=start - orderable.preparation_time, end=end + orderable.recovery_time),
+                self.resource_id_groups,
+            ),
+        )
+        return True
+
+    def release_timeslot(self, user_id: int):
+        if user_id in get_orderable_holds():
+            add_orderable_hold(user_id, None)
 
     @cached_property
     def weekly_times(self) -> WeeklyTimes:
@@ -984,6 +1114,9 @@ class ActivityVariant(models.Model):
                 },
                 "unavailableDatesUrl": reverse("api:activity-unavailable-dates", args=(self.id,)),
                 "businessHoursUrl": reverse("api:activity-business-hours", args=(self.id,)),
+                "holdUrl": (
+                    reverse("api:activity-hold", args=(self.id,)) if settings.LEPRIKON_ORDERABLE_HOLD_TIMEOUT else None
+                ),
                 "selectedEventTimeLabel": str(_("selected event time")),
             }
         )
@@ -995,6 +1128,84 @@ class ActivityAttachment(BaseAttachment):
     )
 
 
+class RegistrationQuerySet(models.QuerySet):
+    def with_payment_status_data(self):
+        return self.select_related("activity__activity_type").prefetch_related("received_payments", "returned_payments")
+
+    def with_amount_due(self):
+        """
+        Annotate the current amount due (as in the payment status) computed by the database from the cached balance,
+        so that the registrations may be filtered, counted and ordered by it.
+        The cached balance is the current one, so the amount due may not be computed for any other date.
+        """
+        d = date.today()
+        price_field = PriceField()
+        zero = models.Value(0, output_field=price_field)
+
+        # prices and discounts of course periods, which are not due yet
+        course_periods = Registration.objects.filter(
+            pk=models.OuterRef("pk"),
+            courseregistration__course_registration_periods__period__due_from__gt=d,
+        ).values("pk")
+        course_discounts = Registration.objects.filter(
+            pk=models.OuterRef("pk"),
+            courseregistration__discounts__registration_period__period__due_from__gt=d,
+            courseregistration__discounts__accounted__date__lte=d,
+        ).values("pk")
+        not_due_price = models.F("price") * Coalesce(
+            models.Subquery(
+                course_periods.annotate(
+                    units=models.Sum("courseregistration__course_registration_periods__period__price_units_count"),
+                ).values("units")
+            ),
+            zero,
+        )
+        not_due_discount = Coalesce(
+            models.Subquery(
+                course_discounts.annotate(
+                    amount=models.Sum("courseregistration__discounts__amount"),
+                ).values("amount")
+            ),
+            zero,
+        )
+
+        # the due date of orderable events is relative to the event date
+        orderable_due = models.Q(activity__orderable__due_from_days__isnull=True)
+        for due_from_days in (
+            Activity.objects.filter(orderable__due_from_days__isnull=False)
+            .order_by()
+            .values_list("orderable__due_from_days", flat=True)
+            .distinct()
+        ):
+            orderable_due |= models.Q(
+                activity__orderable__due_from_days=due_from_days,
+                calendar_event__start_date__lte=d + timedelta(days=due_from_days),
+            )
+
+        return self.annotate(
+            amount_due=models.Case(
+                models.When(
+                    models.Q(payment_requested__isnull=True) | models.Q(payment_requested__date__gt=d),
+                    then=zero,
+                ),
+                models.When(
+                    activity__activity_type__model=ActivityModel.COURSE,
+                    then=Greatest(-(models.F("cached_balance") + not_due_price - not_due_discount), zero),
+                ),
+                models.When(
+                    models.Q(activity__activity_type__model=ActivityModel.EVENT, activity__event__due_from__lte=d)
+                    | (models.Q(activity__activity_type__model=ActivityModel.ORDERABLE) & orderable_due),
+                    then=Greatest(-models.F("cached_balance"), zero),
+                ),
+                default=zero,
+                output_field=price_field,
+            )
+        )
+
+    def not_paid(self):
+        return self.with_amount_due().filter(amount_due__gt=0)
+
+
 class Registration(PdfExportAndMailMixin, models.Model):
     object_name = "registration"
     slug = models.SlugField(editable=False, max_length=250, null=True)
@@ -1096,6 +1307,8 @@ class Registration(PdfExportAndMailMixin, models.Model):
 
     cached_balance = PriceField(_("payments balance"), default=0, editable=False)
 
+    objects = RegistrationQuerySet.as_manager()
+
     class Meta:
         app_label = "leprikon"
         verbose_name = _("registration")
@@ -1142,30 +1355,56 @@ class Registration(PdfExportAndMailMixin, models.Model):
     def participants_list(self):
         return "\n".join(map(str, self.all_participants))
 
+    @classmethod
+    def prefetch_other_registrations_counts(cls, registrations: Iterable["Registration"]):
+        """
+        Set other_registrations_counts of all given registrations using a single grouped query.
+        """
+        registrations = list(registrations)
+        identity_keys = set(p.identity_key for r in registrations for p in r.all_participants)
+        counts = {}
+        if identity_keys:
+            for row in (
+                cls.objects.filter(
+                    activity__school_year_id__in=set(r.activity.school_year_id for r in registrations),
+                    participants__identity_key__in=identity_keys,
+                )
+                .annotate(
+                    is_canceled=models.ExpressionWrapper(
+                        models.Q(canceled__isnull=False), output_field=models.BooleanField()
+                    ),
+                )
+                .values("activity__school_year_id", "is_canceled", "participants__identity_key")
+                .annotate(count=models.Count("id", distinct=True))
+            ):
+                key = (row["activity__school_year_id"], row["is_canceled"], row["participants__identity_key"])
+                counts[key] = row["count"]
+        for registration in registrations:
+            registration.other_registrations_counts = {
+                participant.id: counts.get(
+                    (registration.activity.school_year_id, registration.canceled is not None, participant.identity_key),
+                    1,
+                )
+                - 1
+                for participant in registration.all_participants
+            }
+
+    @cached_property
+    def other_registrations_counts(self) -> Dict[int, int]:
+        """
+        Number of other registrations of each participant (by participant id)
+        in the same school year with the same cancelation status.
+        """
+        type(self).prefetch_other_registrations_counts([self])
+        return self.other_registrations_counts
+
     @attributes(short_description=_("participants"))
     def participants_list_html(self):
         if self.all_participants:
             participant_links = []
             for participant in self.all_participants:
-                if participant.birth_num:
-                    query = dict(participants__birth_num=participant.birth_num)
-                else:
-                    query = dict(
-                        participants__birth_date=participant.birth_date,
-                        participants__first_name=participant.first_name,
-                        participants__last_name=participant.last_name,
-                    )
-                url = "?" + urlencode(query)
-                count = (
-                    type(self)
-                    .objects.filter(
-                        activity__school_year_id=self.activity.school_year_id,
-                        canceled__isnull=not self.canceled,
-                        **query,
-                    )
-                    .count()
-                    - 1
-                )
+                url = "?" + urlencode(dict(participants__identity_key=participant.identity_key))
+                count = self.other_registrations_counts[participant.id]
                 if count:
                     title = ngettext("%d other registration", "%d other registrations", count) % count
                 else:
@@ -1255,12 +1494,7 @@ class Registration(PdfExportAndMailMixin, models.Model):
 
     @cached_property
     def organization(self) -> Organization:
-        return (
-            self.activity.organization
-            or self.activity.activity_type.organization
-            or LeprikonSite.objects.get_current().organization
-            or Organization()
-        )
+        return get_site_defaults().get_activity_organization(self.activity)
 
     @cached_property
     def spayd(self):
@@ -1404,7 +1638,10 @@ class Registration(PdfExportAndMailMixin, models.Model):
         return output.read()
 
     def write_qr_code(self, output):
-        segno.make(self.spayd).save(output, kind="PNG")
+        import segno
+
+        with timed("qr"):
+            segno.make(self.spayd).save(output, kind="PNG")
 
     def write_pdf(self, event, output):
         if event == "payment_request":
@@ -1538,25 +1775,10 @@ class Registration(PdfExportAndMailMixin, models.Model):
 
     def get_print_setup(self, event):
         if event == "payment_request":
-            return (
-                self.activity.pr_print_setup
-                or self.activity.activity_type.pr_print_setup
-                or LeprikonSite.objects.get_current().pr_print_setup
-                or PrintSetup()
-            )
+            return get_site_defaults().get_activity_print_setup(self.activity, "pr_print_setup")
         if event == "decision":
-            return (
-                self.activity.decision_print_setup
-                or self.activity.activity_type.decision_print_setup
-                or LeprikonSite.objects.get_current().decision_print_setup
-                or PrintSetup()
-            )
-        return (
-            self.activity.reg_print_setup
-            or self.activity.activity_type.reg_print_setup
-            or LeprikonSite.objects.get_current().reg_print_setup
-            or PrintSetup()
-        )
+            return get_site_defaults().get_activity_print_setup(self.activity, "decision_print_setup")
+        return get_site_defaults().get_activity_print_setup(self.activity, "reg_print_setup")
 
     def get_template_variants(self):
         return (
@@ -1629,6 +1851,30 @@ class SchoolMixin:
         return self.school_name or self.school_class
 
 
+class RegistrationParticipantQuerySet(models.QuerySet):
+    def with_attendance(self, journals=None):
+        """
+        Annotate journal_entries_count and presences_count of the participants in all their journals
+        (or only in given journals, e.g. the journals of an activity or a school year).
+        """
+        from .journals import JournalEntry
+
+        journal_entries = JournalEntry.objects.filter(journal__participants=models.OuterRef("pk"))
+        if journals is not None:
+            journal_entries = journal_entries.filter(journal__in=journals)
+        return self.annotate(
+            journal_entries_count=SubqueryCount(journal_entries.values("id")),
+            presences_count=SubqueryCount(journal_entries.filter(participants=models.OuterRef("pk")).values("id")),
+        )
+
+    def attendance_totals(self, journals=None) -> dict[str, int]:
+        totals = self.with_attendance(journals).aggregate(
+            journal_entries_count=models.Sum("journal_entries_count"),
+            presences_count=models.Sum("presences_count"),
+        )
+        return {key: value or 0 for key, value in totals.items()}
+
+
 class RegistrationParticipant(SchoolMixin, PersonMixin, QuestionsMixin, models.Model):
     registration = models.ForeignKey(
         Registration, on_delete=models.CASCADE, related_name="participants", verbose_name=_("registration")
@@ -1677,6 +1923,11 @@ class RegistrationParticipant(SchoolMixin, PersonMixin, QuestionsMixin, models.M
 
     answers = models.TextField(_("additional answers"), blank=True, default="{}", editable=False)
 
+    # normalized identity used to find registrations of the same participant
+    identity_key = models.CharField(max_length=100, editable=False, db_index=True, default="")
+
+    objects = RegistrationParticipantQuerySet.as_manager()
+
     class Meta:
         app_label = "leprikon"
         ordering = ("last_name", "first_name")
@@ -1727,16 +1978,39 @@ class RegistrationParticipant(SchoolMixin, PersonMixin, QuestionsMixin, models.M
 
     PresenceRecord = namedtuple("PresenceRecord", ("entry", "present"))
 
-    @property
-    def presences(self):
+    @classmethod
+    def prefetch_presences(cls, participants: Iterable["RegistrationParticipant"]):
+        """
+        Set presences of all given participants in all their journals using a single query.
+        """
         from .journals import JournalEntry
 
-        present_entry_ids = set(self.journal_entries.values_list("id", flat=True))
+        participants = list(participants)
+        presences = defaultdict(list)
+        if participants:
+            for entry in JournalEntry.objects.filter(journal__participants__in=participants).annotate(
+                participant_id=models.F("journal__participants"),
+                present=models.Exists(
+                    JournalEntry.participants.through.objects.filter(
+                        journalentry=models.OuterRef("pk"),
+                        registrationparticipant=models.OuterRef("participant_id"),
+                    )
+                ),
+            ):
+                presences[entry.participant_id].append(cls.PresenceRecord(entry, entry.present))
+        for participant in participants:
+            participant.presences = presences[participant.id]
 
-        return [
-            self.PresenceRecord(entry, entry.id in present_entry_ids)
-            for entry in JournalEntry.objects.filter(journal__participants=self)
-        ]
+    @cached_property
+    def presences(self):
+        type(self).prefetch_presences([self])
+        return self.presences
+
+    @cached_property
+    def attendance_stats(self):
+        from .journals import AttendanceStats
+
+        return AttendanceStats.from_presences(present for entry, present in self.presences)
 
     def save(self, *args, **kwargs):
         if not self.has_parent1:
@@ -1766,8 +2040,14 @@ class RegistrationParticipant(SchoolMixin, PersonMixin, QuestionsMixin, models.M
             self.parent2_postal_code = None
             self.parent2_phone = None
             self.parent2_email = None
+        self.identity_key = self.get_identity_key()
         super().save(*args, **kwargs)
 
+    def get_identity_key(self) -> str:
+        if self.birth_num:
+            return self.birth_num.replace("/", "")
+        return f"{self.birth_date}:{self.first_name.strip().lower()}:{self.last_name.strip().lower()}"
+
     class Parent(PersonMixin):
         def __init__(self, registration, role):
             self._registration = registration
@@ -1889,24 +2169,14 @@ class ActivityDiscount(AbstractTransaction):
 class PaymentMixin:
     @cached_property
     def activity_organization(self):
-        return (
-            self.registration.activity.organization
-            or self.registration.activity.activity_type.organization
-            or LeprikonSite.objects.get_current().organization
-            or Organization()
-        )
+        return get_site_defaults().get_activity_organization(self.registration.activity)
 
     @cached_property
     def slug(self):
         return f"{self.registration.slug}-{self.id}"
 
     def get_print_setup(self, event):
-        return (
-            self.registration.activity.bill_print_setup
-            or self.registration.activity.activity_type.bill_print_setup
-            or LeprikonSite.objects.get_current().bill_print_setup
-            or PrintSetup()
-        )
+        return get_site_defaults().get_activity_print_setup(self.registration.activity, "bill_print_setup")
 
     def get_template_variants(self):
         return (
@@ -2065,23 +2335,21 @@ def page_update_activity_type(instance, **kwargs):
         ActivityType.objects.filter(id=activity_type.id).update(page=page)
 
 
-@receiver(models.signals.post_save, sender=BankreaderTransaction)
-def transaction_create_payment(instance, **kwargs):
-    transaction = instance
+def create_bank_transaction_payment(transaction: BankreaderTransaction) -> bool:
     # check variable symbol
     if not transaction.variable_symbol:
-        return
+        return False
     # check closure date (use closure date from cached leprikon site)
     max_closure_date = LeprikonSite.objects.get_current().max_closure_date
     if max_closure_date and transaction.accounted_date <= max_closure_date:
-        return
+        return False
     # check registration by primary variable symbol, then by alternative variable symbol
     registration = (
         Registration.objects.filter(variable_symbol=transaction.variable_symbol).first()
         or Registration.objects.filter(alt_variable_symbol=transaction.variable_symbol).first()
     )
     if not registration:
-        return
+        return False
     # create payment
     if transaction.amount < 0:
         kwargs = {
@@ -2101,3 +2369,90 @@ def transaction_create_payment(instance, **kwargs):
         bankreader_transaction=transaction,
         **kwargs,
     )
+    return True
+
+
+@receiver(models.signals.post_save, sender=BankreaderTransaction)
+def transaction_create_payment(instance, **kwargs):
+    with BANK_TRANSACTION_SECONDS.time():
+        matched = create_bank_transaction_payment(instance)
+    BANK_TRANSACTIONS.inc(result="matched" if matched else "unmatched")
+
+
+ACTIVITY_LIST_CACHE_VERSION_KEY = "leprikon:activity_list_version"
+
+
+def get_activity_list_cache_version():
+    return cache.get_or_set(ACTIVITY_LIST_CACHE_VERSION_KEY, lambda: timezone.now().timestamp(), None)
+
+
+def get_activity_list_cache_user_key(request, school_year) -> str:
+    """
+    Part of the activity list cache key distinguishing only the users, who see different lists:
+    staff and leaders (edit buttons) and users with their own registrations (links to them).
+    """
+    user = request.user
+    parts = []
+    if user.is_staff:
+        parts.append("staff")
+    elif getattr(request, "leader", None):
+        parts.append(f"leader:{request.leader.id}")
+    if (
+        user.is_authenticated
+        and Registration.objects.filter(user=user, canceled=None, activity__school_year=school_year).exists()
+    ):
+        parts.append(f"user:{user.pk}")
+    return ",".join(parts)
+
+
+def invalidate_activity_list_cache():
+    cache.set(ACTIVITY_LIST_CACHE_VERSION_KEY, timezone.now().timestamp(), None)
+
+
+@receiver(models.signals.post_save)
+@receiver(models.signals.post_delete)
+@receiver(models.signals.m2m_changed)
+def activity_list_invalidate_cache(instance, update_fields=None, **kwargs):
+    if not isinstance(
+        instance,
+        (ActivityType, ActivityGroup, Activity, ActivityTime, ActivityVariant, BaseAttachment, Registration, CMSPlugin),
+    ):
+        return
+    # updates of cached balance do not affect rendered activity lists
+    if update_fields and set(update_fields) == {"cached_balance"}:
+        return
+    invalidate_activity_list_cache()
+
+
+REPORT_DATA_VERSION_KEY = "leprikon:report_data_version"
+
+
+def get_report_data_version():
+    return cache.get_or_set(REPORT_DATA_VERSION_KEY, lambda: timezone.now().timestamp(), None)
+
+
+@receiver(models.signals.post_save)
+@receiver(models.signals.post_delete)
+@receiver(models.signals.m2m_changed)
+def report_data_invalidate_cache(instance, update_fields=None, **kwargs):
+    from .courses import CourseRegistrationPeriod
+    from .journals import Journal, JournalEntry, JournalTime
+
+    # only the data read by the reports may affect their results
+    if not isinstance(
+        instance,
+        (
+            Registration,
+            CourseRegistrationPeriod,
+            RegistrationParticipant,
+            AbstractTransaction,
+            ActivityTime,
+            Journal,
+            JournalEntry,
+            JournalTime,
+        ),
+    ):
+        return
+    if update_fields and set(update_fields) == {"cached_balance"}:
+        return
+    cache.set(REPORT_DATA_VERSION_KEY, timezone.now().timestamp(), None)
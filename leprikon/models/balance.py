@@ -0,0 +1,84 @@
+from collections import namedtuple
+from typing import Iterable, Iterator
+
+from django.db import models
+from django.dispatch import receiver
+
+from .activities import ActivityDiscount, Registration
+from .courses import CourseRegistration, CourseRegistrationPeriod
+from .events import EventRegistration
+from .orderables import OrderableRegistration
+from .schoolyear import SchoolYearPeriod
+from .transaction import Transaction
+
+REGISTRATION_MODELS = (CourseRegistration, EventRegistration, OrderableRegistration)
+
+BalanceDrift = namedtuple("BalanceDrift", ("registration", "cached_balance", "balance"))
+
+
+def get_balance_drifts(registrations: models.QuerySet) -> Iterator[BalanceDrift]:
+    """
+    Compute payment balances of given registrations
+    and yield those, which do not match the stored Registration.cached_balance.
+    """
+    registration_ids = registrations.values("id")
+    for registration_model in REGISTRATION_MODELS:
+        for registration in registration_model.objects.filter(id__in=registration_ids).with_payment_status_data():
+            balance = registration.get_payment_status().balance
+            if registration.cached_balance != balance:
+                yield BalanceDrift(registration, registration.cached_balance, balance)
+
+
+def update_cached_balances(registrations: models.QuerySet) -> list[BalanceDrift]:
+    """
+    Store current payment balances of given registrations with a bulk update of those, which differ.
+    The update does not trigger any signals.
+    """
+    drifts = list(get_balance_drifts(registrations))
+    for drift in drifts:
+        drift.registration.cached_balance = drift.balance
+    Registration.objects.bulk_update([drift.registration for drift in drifts], ["cached_balance"], batch_size=500)
+    return drifts
+
+
+def update_registrations_cached_balance(registration_ids: Iterable[int]):
+    registration_ids = set(filter(None, registration_ids))
+    if registration_ids:
+        update_cached_balances(Registration.objects.filter(id__in=registration_ids))
+
+
+def get_balance_registration_ids(instance) -> set[int]:
+    if isinstance(instance, Transaction):
+        return {instance.source_registration_id, instance.target_registration_id}
+    if isinstance(instance, (ActivityDiscount, CourseRegistrationPeriod)):
+        return {instance.registration_id}
+    if isinstance(instance, Registration):
+        return {instance.id}
+    return set()
+
+
+@receiver(models.signals.pre_save)
+def cached_balance_pre_save(instance, raw=False, **kwargs):
+    # remember the original registrations of a changed payment or discount, which lose it
+    if raw or not instance.pk or not isinstance(instance, (Transaction, ActivityDiscount)):
+        return
+    original = type(instance)._base_manager.filter(pk=instance.pk).first()
+    instance._original_balance_registration_ids = get_balance_registration_ids(original) if original else set()
+
+
+@receiver(models.signals.post_save)
+@receiver(models.signals.post_delete)
+def cached_balance_update(instance, raw=False, update_fields=None, **kwargs):
+    """
+    Keep Registration.cached_balance up to date whenever any data affecting the balance are written.
+    The balance is updated in the same database transaction as the change itself.
+    """
+    if raw or (update_fields and set(update_fields) == {"cached_balance"}):
+        return
+    if isinstance(instance, SchoolYearPeriod):
+        # the price of course registrations depends on the number of price units of the period
+        update_cached_balances(CourseRegistration.objects.filter(course_registration_periods__period=instance))
+        return
+    registration_ids = get_balance_registration_ids(instance)
+    registration_ids.update(getattr(instance, "_original_balance_registration_ids", ()))
+    update_registrations_cached_balance(registration_ids)
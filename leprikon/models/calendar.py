@@ -12,7 +12,6 @@ from django.template.loader import get_template
 from django.urls import reverse
 from django.utils.formats import date_format, time_format
 from django.utils.translation import gettext_lazy as _
-from icalendar import Calendar, Event
 
 from leprikon.models.leprikonsite import LeprikonSite
 from leprikon.utils.calendar import (
@@ -338,6 +337,8 @@ class CalendarExport(models.Model):
         return qs
 
     def get_ical(self) -> str:
+        from icalendar import Calendar, Event
+
         calendar = Calendar()
         calendar.add("prodid", "-//Leprikon//Calendar Export//EN")
         calendar.add("version", "2.0")
@@ -4,7 +4,7 @@ from typing import List
 
 from cms.models import CMSPlugin
 from django.db import models, transaction
-from django.utils.functional import cached_property
+from django.utils.functional import SimpleLazyObject, cached_property
 from django.utils.translation import gettext_lazy as _
 
 from ..conf import settings
@@ -14,15 +14,18 @@ from .activities import (
     ActivityGroup,
     ActivityModel,
     ActivityType,
-    ActivityVariant,
     Registration,
+    RegistrationQuerySet,
+    get_activity_list_cache_user_key,
+    get_activity_list_cache_version,
 )
 from .agegroup import AgeGroup
 from .department import Department
 from .roles import Leader
-from .schoolyear import SchoolYear, SchoolYearDivision, SchoolYearPeriod
+from .rollover import copy_activities_to_school_year
+from .schoolyear import SchoolYear, SchoolYearPeriod
 from .targetgroup import TargetGroup
-from .utils import PaymentStatus, change_year, copy_related_objects
+from .utils import PaymentStatus
 
 
 class Course(Activity):
@@ -33,45 +36,30 @@ class Course(Activity):
         verbose_name_plural = _("courses")
 
     def copy_to_school_year(old, school_year: SchoolYear):
-        new = Course.objects.get(id=old.id)
-        new.id, new.pk = None, None
-        new.school_year = school_year
-        new.public = False
-        new.note = ""
-        year_delta = school_year.year - old.school_year.year
-        new.save()
-        new.groups.set(old.groups.all())
-        new.age_groups.set(old.age_groups.all())
-        new.target_groups.set(old.target_groups.all())
-        for leader in old.all_leaders:
-            school_year.leaders.add(leader)
-        new.leaders.set(old.all_leaders)
-        new.questions.set(old.questions.all())
-        for old_variant in old.all_variants:
-            new_variant = ActivityVariant.objects.get(id=old_variant.id)
-            new_variant.id, new_variant.pk = None, None
-            new_variant.activity = new
-            if old_variant.school_year_division:
-                new_variant.school_year_division = SchoolYearDivision.objects.filter(
-                    school_year=school_year,
-                    name=old_variant.school_year_division.name,
-                ).first() or old_variant.school_year_division.copy_to_school_year(school_year)
-            new_variant.reg_from = change_year(new_variant.reg_from, year_delta)
-            new_variant.reg_to = change_year(new_variant.reg_to, year_delta)
-            new_variant.save()
-            new_variant.age_groups.set(old_variant.age_groups.all())
-            new_variant.target_groups.set(old_variant.target_groups.all())
-        copy_related_objects(
-            new,
-            attachments=old.attachments,
-            times=old.times,
+        return copy_activities_to_school_year([old], school_year)[0]
+
+
+class CourseRegistrationQuerySet(RegistrationQuerySet):
+    def with_payment_status_data(self):
+        return (
+            super()
+            .with_payment_status_data()
+            .prefetch_related(
+                "discounts",
+                models.Prefetch(
+                    "course_registration_periods",
+                    queryset=CourseRegistrationPeriod.objects.select_related("period"),
+                    to_attr="all_registration_periods",
+                ),
+            )
         )
-        return new
 
 
 class CourseRegistration(Registration):
     activity_type_model = ActivityModel.COURSE
 
+    objects = CourseRegistrationQuerySet.as_manager()
+
     class Meta:
         app_label = "leprikon"
         verbose_name = _("course registration")
@@ -119,11 +107,7 @@ class CourseRegistration(Registration):
             )
 
     def get_payment_status(self, d=None):
-        payment_status = sum(pps.status for pps in self.get_period_payment_statuses(d))
-        if d is None and self.cached_balance != payment_status.balance:
-            self.cached_balance = payment_status.balance
-            self.save(update_fields=["cached_balance"])
-        return payment_status
+        return sum(pps.status for pps in self.get_period_payment_statuses(d))
 
     @cached_property
     def period_payment_statuses(self):
@@ -342,11 +326,8 @@ class CourseListPlugin(CMSPlugin):
 
     Group = namedtuple("Group", ("group", "objects"))
 
-    def render(self, context):
-        school_year = (
-            self.school_year or getattr(context.get("request"), "school_year") or SchoolYear.objects.get_current()
-        )
-        courses = Course.objects.filter(school_year=school_year, public=True).distinct()
+    def get_courses(self, school_year):
+        courses = Course.objects.filter(school_year=school_year, public=True)
 
         if self.all_departments:
             courses = courses.filter(department__in=self.all_departments)
@@ -360,17 +341,34 @@ class CourseListPlugin(CMSPlugin):
             courses = courses.filter(leaders__in=self.all_leaders)
         if self.all_groups:
             courses = courses.filter(groups__in=self.all_groups)
+        return list(courses.distinct().with_preview_data())
+
+    def get_groups(self, courses):
+        if self.all_groups:
             groups = self.all_groups
         elif self.all_course_types:
             groups = ActivityGroup.objects.filter(activity_types__in=self.all_course_types)
         else:
             groups = ActivityGroup.objects.all()
+        return [
+            self.Group(group=group, objects=[course for course in courses if group in course.all_groups])
+            for group in groups
+        ]
 
+    def render(self, context):
+        school_year = (
+            self.school_year or getattr(context.get("request"), "school_year") or SchoolYear.objects.get_current()
+        )
+        # activities are only loaded if the rendered list is not found in the cache
+        courses = SimpleLazyObject(lambda: self.get_courses(school_year))
         context.update(
             {
                 "school_year": school_year,
                 "courses": courses,
-                "groups": (self.Group(group=group, objects=courses.filter(groups=group)) for group in groups),
+                "groups": SimpleLazyObject(lambda: self.get_groups(courses)),
+                "cache_timeout": settings.LEPRIKON_ACTIVITY_LIST_CACHE_TIMEOUT,
+                "cache_version": get_activity_list_cache_version(),
+                "cache_user_key": get_activity_list_cache_user_key(context["request"], school_year),
             }
         )
         return context
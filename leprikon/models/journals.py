@@ -1,6 +1,7 @@
-from collections import namedtuple
+from collections import defaultdict, namedtuple
 from datetime import datetime, timedelta
-from typing import Optional
+from itertools import groupby
+from typing import Iterable, Optional
 
 from django.db import models
 from django.urls import reverse_lazy as reverse
@@ -17,14 +18,132 @@ from .startend import StartEndMixin
 from .times import AbstractTime, TimesMixin
 
 
+class AttendanceStats(
+    namedtuple(
+        "AttendanceStats",
+        ("entries_count", "presences_count", "longest_absence_streak", "current_absence_streak"),
+    )
+):
+    @classmethod
+    def from_presences(cls, presences: Iterable[bool]) -> "AttendanceStats":
+        entries_count = presences_count = longest_absence_streak = current_absence_streak = 0
+        for present in presences:
+            entries_count += 1
+            if present:
+                presences_count += 1
+                current_absence_streak = 0
+            else:
+                current_absence_streak += 1
+                longest_absence_streak = max(longest_absence_streak, current_absence_streak)
+        return cls(entries_count, presences_count, longest_absence_streak, current_absence_streak)
+
+    @property
+    def absences_count(self) -> int:
+        return self.entries_count - self.presences_count
+
+    @property
+    def presence_ratio(self) -> Optional[float]:
+        return self.presences_count / self.entries_count if self.entries_count else None
+
+
+def get_attendance_stats(participants: models.QuerySet, journals=None) -> dict[int, AttendanceStats]:
+    """
+    Returns attendance statistics of given participants in all their journals
+    (or only in given journals) indexed by participant id.
+    The counts are computed by the database, the absence streaks are computed
+    from one query returning the ordered presences of all the participants.
+    """
+    stats = {
+        participant_id: AttendanceStats(entries_count, presences_count, 0, 0)
+        for participant_id, entries_count, presences_count in participants.with_attendance(journals)
+        .order_by()
+        .values_list("id", "journal_entries_count", "presences_count")
+    }
+    journal_participants = Journal.participants.through.objects.filter(
+        registrationparticipant__in=participants.order_by().values("id"),
+        journal__journal_entries__isnull=False,
+    )
+    if journals is not None:
+        journal_participants = journal_participants.filter(journal__in=journals)
+    rows = (
+        journal_participants.annotate(
+            present=models.Exists(
+                JournalEntry.participants.through.objects.filter(
+                    journalentry=models.OuterRef("journal__journal_entries"),
+                    registrationparticipant=models.OuterRef("registrationparticipant"),
+                )
+            )
+        )
+        .order_by(
+            "registrationparticipant",
+            "journal__journal_entries__date",
+            "journal__journal_entries__start",
+        )
+        .values_list("registrationparticipant_id", "present")
+    )
+    for participant_id, participant_rows in groupby(rows, key=lambda row: row[0]):
+        streaks = AttendanceStats.from_presences(present for _participant_id, present in participant_rows)
+        stats[participant_id] = stats[participant_id]._replace(
+            longest_absence_streak=streaks.longest_absence_streak,
+            current_absence_streak=streaks.current_absence_streak,
+        )
+    return stats
+
+
+class JournalAttendance:
+    """
+    Attendance of all participants and leaders in all entries of the journal,
+    loaded with one query per relation. Presences of each participant are kept
+    as a bitmap, where n-th bit is set if the participant attended n-th entry.
+    """
+
+    def __init__(self, journal: "Journal"):
+        self.journal: Journal = journal
+        self.entries: list["JournalEntry"] = journal.all_journal_entries
+        self.entry_index: dict[int, int] = {entry.id: index for index, entry in enumerate(self.entries)}
+        self.participant_presences: dict[int, int] = defaultdict(int)
+        self.leader_entries: dict[tuple[int, int], "JournalLeaderEntry"] = {}
+
+        participants_by_entry = defaultdict(list)
+        for entry_participant in JournalEntry.participants.through.objects.filter(
+            journalentry__journal=journal
+        ).select_related("registrationparticipant"):
+            participants_by_entry[entry_participant.journalentry_id].append(entry_participant.registrationparticipant)
+            self.participant_presences[entry_participant.registrationparticipant_id] |= (
+                1 << self.entry_index[entry_participant.journalentry_id]
+            )
+
+        leader_entries_by_entry = defaultdict(list)
+        for leader_entry in JournalLeaderEntry.objects.filter(journal_entry__journal=journal).select_related(
+            "timesheet__leader"
+        ):
+            leader_entries_by_entry[leader_entry.journal_entry_id].append(leader_entry)
+            self.leader_entries[leader_entry.journal_entry_id, leader_entry.timesheet.leader_id] = leader_entry
+
+        # populate cached relations of the entries to avoid queries per entry
+        for entry in self.entries:
+            entry.journal = journal
+            entry.all_participants = participants_by_entry[entry.id]
+            entry.all_leader_entries = leader_entries_by_entry[entry.id]
+
+    def is_present(self, participant_id: int, entry: "JournalEntry") -> bool:
+        return bool(self.participant_presences.get(participant_id, 0) >> self.entry_index[entry.id] & 1)
+
+    def get_leader_entry(self, leader_id: int, entry: "JournalEntry") -> Optional["JournalLeaderEntry"]:
+        return self.leader_entries.get((entry.id, leader_id))
+
+
 class JournalPeriod:
     def __init__(self, journal: "Journal", period: SchoolYearPeriod = None):
         self.journal: Journal = journal
         self.period: Optional[SchoolYearPeriod] = period
 
-    @property
+    @cached_property
     def all_journal_entries(self):
-        return list(self.journal.journal_entries.filter(period=self.period))
+        # entries with participants and leader entries populated by the journal attendance
+        return [
+            entry for entry in self.journal.attendance.entries if entry.period_id == (self.period and self.period.id)
+        ]
 
     @cached_property
     def all_participants(self):
@@ -55,26 +174,31 @@ class JournalPeriod:
     PresenceRecord = namedtuple("PresenceRecord", ("person", "presences"))
 
     def get_participant_presences(self):
+        attendance = self.journal.attendance
         return [
             self.PresenceRecord(
-                participant, [participant.id in entry.all_participants_idset for entry in self.all_journal_entries]
+                participant,
+                [attendance.is_present(participant.id, entry) for entry in self.all_journal_entries],
             )
             for participant in self.all_participants
         ]
 
     def get_leader_presences(self):
+        attendance = self.journal.attendance
         return [
             self.PresenceRecord(
-                leader, [entry.all_leader_entries_by_leader.get(leader, None) for entry in self.all_journal_entries]
+                leader,
+                [attendance.get_leader_entry(leader.id, entry) for entry in self.all_journal_entries],
             )
             for leader in self.journal.all_leaders
         ]
 
     def get_alternate_presences(self):
+        attendance = self.journal.attendance
         return [
             self.PresenceRecord(
                 alternate,
-                [entry.all_leader_entries_by_leader.get(alternate, None) for entry in self.all_journal_entries],
+                [attendance.get_leader_entry(alternate.id, entry) for entry in self.all_journal_entries],
             )
             for alternate in self.all_alternates
         ]
@@ -114,6 +238,10 @@ class Journal(PdfExportAndMailMixin, TimesMixin, models.Model):
     def all_journal_entries(self):
         return list(self.journal_entries.all())
 
+    @cached_property
+    def attendance(self) -> JournalAttendance:
+        return JournalAttendance(self)
+
     @cached_property
     def all_journal_periods(self):
         if self.school_year_division:
@@ -1,7 +1,12 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
 from time import time
+from typing import Optional
 
 from django.contrib.sites.models import Site
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.dispatch import receiver
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from django_pays.models import Gateway
@@ -13,21 +18,39 @@ from .agreements import Agreement
 from .organizations import Organization
 from .printsetup import PrintSetup
 
+SITE_VERSION_KEY = "leprikon:site_version"
+
 
 class LeprikonSiteManager(models.Manager):
     _cached_site = None
+    _cached_version = None
     _cache_timestamp = None
 
     def get_current(self):
+        site_defaults = _site_defaults.get()
+        if site_defaults:
+            return site_defaults.site
+        # the site is cached in each process until the version in the shared cache changes
+        # or at most for LEPRIKON_SITE_CACHE_MAX_AGE seconds
         now = time()
-        if not self._cached_site or now - self._cache_timestamp > settings.LEPRIKON_SITE_CACHE_MAX_AGE:
+        version = cache.get_or_set(SITE_VERSION_KEY, time, None)
+        if (
+            not self._cached_site
+            or self._cached_version != version
+            or now - self._cache_timestamp > settings.LEPRIKON_SITE_CACHE_MAX_AGE
+        ):
             lookup_kwargs = {}
             if getattr(settings, "SITE_ID", ""):
                 lookup_kwargs["pk"] = settings.SITE_ID
             self._cached_site = self.get_or_create(**lookup_kwargs)[0]
+            self._cached_version = version
             self._cache_timestamp = now
         return self._cached_site
 
+    def clear_cache(self):
+        cache.set(SITE_VERSION_KEY, time(), None)
+        _site_defaults.set(None)
+
     def get_queryset(self):
         return (
             super()
@@ -107,3 +130,58 @@ class LeprikonSite(Site):
     @cached_property
     def url(self):
         return settings.LEPRIKON_URL or f"https://{self.domain}"
+
+
+class SiteDefaults:
+    """
+    Site and the default organizations and print setups of activities resolved once per request or job
+    """
+
+    def __init__(self, site: LeprikonSite):
+        self.site = site
+        self._organizations: dict[int, Organization] = {}
+        self._print_setups: dict[int, PrintSetup] = {}
+
+    def get_activity_organization(self, activity) -> Organization:
+        organization_id = activity.organization_id or activity.activity_type.organization_id
+        if not organization_id:
+            return self.site.organization or Organization()
+        if organization_id not in self._organizations:
+            self._organizations[organization_id] = Organization.objects.get(id=organization_id)
+        return self._organizations[organization_id]
+
+    def get_activity_print_setup(self, activity, field_name: str) -> PrintSetup:
+        print_setup_id = getattr(activity, f"{field_name}_id") or getattr(activity.activity_type, f"{field_name}_id")
+        if not print_setup_id:
+            return getattr(self.site, field_name) or PrintSetup()
+        if print_setup_id not in self._print_setups:
+            self._print_setups[print_setup_id] = PrintSetup.objects.get(id=print_setup_id)
+        return self._print_setups[print_setup_id]
+
+
+_site_defaults: ContextVar[Optional[SiteDefaults]] = ContextVar("leprikon_site_defaults", default=None)
+
+
+def get_site_defaults() -> SiteDefaults:
+    return _site_defaults.get() or SiteDefaults(LeprikonSite.objects.get_current())
+
+
+@contextmanager
+def site_defaults_scope():
+    """
+    Share site defaults by all the code running within the context (e.g. a request or a cron job).
+    """
+    token = _site_defaults.set(get_site_defaults())
+    try:
+        yield
+    finally:
+        _site_defaults.reset(token)
+
+
+@receiver(models.signals.post_save)
+@receiver(models.signals.post_delete)
+@receiver(models.signals.m2m_changed)
+def leprikon_site_invalidate_cache(instance, **kwargs):
+    if isinstance(instance, (Site, Organization, PrintSetup, Agreement, Gateway, AccountClosure)):
+        # bump the version once the changes are visible to other processes
+        transaction.on_commit(LeprikonSite.objects.clear_cache)
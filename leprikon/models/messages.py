@@ -11,6 +11,8 @@ from djangocms_text.fields import HTMLField
 from filer.fields.file import FilerFileField
 
 from ..conf import settings
+from ..utils.instrumentation import timed
+from ..utils.metrics import MAIL_SEND_SECONDS
 from .leprikonsite import LeprikonSite
 
 
@@ -103,7 +105,8 @@ class MessageRecipient(models.Model):
         msg.attach_alternative(get_template("leprikon/message_mail.html").render(context), "text/html")
         for attachment in self.message.attachments.all():
             msg.attach_file(attachment.file.file.path)
-        msg.send()
+        with timed("mail"), MAIL_SEND_SECONDS.time(object_name="message"):
+            msg.send()
         self.sent_mail = now()
         self.save()
 
@@ -3,7 +3,7 @@ from datetime import date, timedelta
 
 from cms.models import CMSPlugin
 from django.db import models
-from django.utils.functional import cached_property
+from django.utils.functional import SimpleLazyObject, cached_property
 from django.utils.translation import gettext_lazy as _
 
 from ..conf import settings
@@ -14,15 +14,18 @@ from .activities import (
     ActivityGroup,
     ActivityModel,
     ActivityType,
-    ActivityVariant,
     Registration,
+    RegistrationQuerySet,
+    get_activity_list_cache_user_key,
+    get_activity_list_cache_version,
 )
 from .agegroup import AgeGroup
 from .department import Department
 from .roles import Leader
-from .schoolyear import SchoolYear, SchoolYearDivision
+from .rollover import copy_activities_to_school_year
+from .schoolyear import SchoolYear
 from .targetgroup import TargetGroup
-from .utils import PaymentStatus, change_year, copy_related_objects
+from .utils import PaymentStatus
 
 
 class Orderable(Activity):
@@ -56,52 +59,31 @@ class Orderable(Activity):
         verbose_name_plural = _("orderable events")
 
     def copy_to_school_year(old, school_year: SchoolYear):
-        new = Orderable.objects.get(id=old.id)
-        new.id, new.pk = None, None
-        new.school_year = school_year
-        new.public = False
-        new.note = ""
-        year_delta = school_year.year - old.school_year.year
-        new.save()
-        new.groups.set(old.groups.all())
-        new.age_groups.set(old.age_groups.all())
-        new.target_groups.set(old.target_groups.all())
-        for leader in old.all_leaders:
-            school_year.leaders.add(leader)
-        new.leaders.set(old.all_leaders)
-        new.questions.set(old.questions.all())
-        for old_variant in old.all_variants:
-            new_variant = ActivityVariant.objects.get(id=old_variant.id)
-            new_variant.id, new_variant.pk = None, None
-            new_variant.activity = new
-            if old_variant.school_year_division:
-                new_variant.school_year_division = SchoolYearDivision.objects.filter(
-                    school_year=school_year,
-                    name=old_variant.school_year_division.name,
-                ).first() or old_variant.school_year_division.copy_to_school_year(school_year)
-            new_variant.reg_from = change_year(new_variant.reg_from, year_delta)
-            new_variant.reg_to = change_year(new_variant.reg_to, year_delta)
-            new_variant.save()
-            new_variant.age_groups.set(old_variant.age_groups.all())
-            new_variant.target_groups.set(old_variant.target_groups.all())
-        copy_related_objects(
-            new,
-            attachments=old.attachments,
-            times=old.times,
+        return copy_activities_to_school_year([old], school_year)[0]
+
+
+class OrderableRegistrationQuerySet(RegistrationQuerySet):
+    def with_payment_status_data(self):
+        return (
+            super()
+            .with_payment_status_data()
+            .select_related("activity__orderable", "calendar_event")
+            .prefetch_related("discounts")
         )
-        return new
 
 
 class OrderableRegistration(Registration):
     activity_type_model = ActivityModel.ORDERABLE
 
+    objects = OrderableRegistrationQuerySet.as_manager()
+
     class Meta:
         app_label = "leprikon"
         verbose_name = _("orderable event registration")
         verbose_name_plural = _("orderable event registrations")
 
     def get_payment_status(self, d=None):
-        payment_status = PaymentStatus(
+        return PaymentStatus(
             price=self.price,
             discount=self.get_discounted(d),
             explanation=",\n".join(
@@ -127,10 +109,6 @@ class OrderableRegistration(Registration):
                 self.payment_requested.date() + timedelta(days=self.activity.orderable.min_due_date_days),
             ),
         )
-        if d is None and self.cached_balance != payment_status.balance:
-            self.cached_balance = payment_status.balance
-            self.save(update_fields=["cached_balance"])
-        return payment_status
 
     @attributes(admin_order_field="calendar_event__start_date", short_description=_("event date"))
     def event_date(self) -> str:
@@ -255,11 +233,8 @@ class OrderableListPlugin(CMSPlugin):
 
     Group = namedtuple("Group", ("group", "objects"))
 
-    def render(self, context):
-        school_year = (
-            self.school_year or getattr(context.get("request"), "school_year") or SchoolYear.objects.get_current()
-        )
-        events = Orderable.objects.filter(school_year=school_year, public=True).distinct()
+    def get_events(self, school_year):
+        events = Orderable.objects.filter(school_year=school_year, public=True)
 
         if self.all_departments:
             events = events.filter(department__in=self.all_departments)
@@ -273,17 +248,35 @@ class OrderableListPlugin(CMSPlugin):
             events = events.filter(leaders__in=self.all_leaders)
         if self.all_groups:
             events = events.filter(groups__in=self.all_groups)
+        return list(events.distinct().with_preview_data())
+
+    def get_groups(self, events):
+        if self.all_groups:
             groups = self.all_groups
         elif self.all_event_types:
             groups = ActivityGroup.objects.filter(activity_types__in=self.all_event_types)
         else:
             groups = ActivityGroup.objects.all()
+        return [
+            self.Group(group=group, objects=[event for event in events if group in event.all_groups])
+            for group in groups
+        ]
 
+    def render(self, context):
+        school_year = (
+            self.school_year or getattr(context.get("request"), "school_year") or SchoolYear.objects.get_current()
+        )
+        # activities are only loaded if the rendered list is not found in the cache
+        events = SimpleLazyObject(lambda: self.get_events(school_year))
         context.update(
             {
                 "school_year": school_year,
                 "events": events,
-                "groups": (self.Group(group=group, objects=events.filter(groups=group)) for group in groups),
+                "orderables": events,
+                "groups": SimpleLazyObject(lambda: self.get_groups(events)),
+                "cache_timeout": settings.LEPRIKON_ACTIVITY_LIST_CACHE_TIMEOUT,
+                "cache_version": get_activity_list_cache_version(),
+                "cache_user_key": get_activity_list_cache_user_key(context["request"], school_year),
             }
         )
         return context
@@ -1,15 +1,15 @@
 import re
 from io import BytesIO
 
-import trml2pdf
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import select_template
 from django.urls import reverse
 from django.utils.functional import cached_property
 from django.utils.text import slugify
-from pypdf import PdfReader, PdfWriter
 
 from ..conf import settings
+from ..utils.instrumentation import timed
+from ..utils.metrics import MAIL_SEND_SECONDS, PDF_RENDER_SECONDS
 from .leprikonsite import LeprikonSite
 from .printsetup import PrintSetup
 from .utils import shorten
@@ -65,7 +65,7 @@ class PdfExportAndMailMixin(object):
         html = html_template.render(context)
         txt = txt_template.render(context)
         subject = subject_template.render(context)
-        EmailMultiAlternatives(
+        message = EmailMultiAlternatives(
             subject=whitespace.sub(" ", subject).strip(),
             body=txt.strip(),
             from_email=settings.SERVER_EMAIL,
@@ -73,7 +73,9 @@ class PdfExportAndMailMixin(object):
             headers={"X-Mailer": "Leprikon (http://leprikon.cz/)"},
             alternatives=[(html, "text/html")],
             attachments=self.get_attachments(event),
-        ).send()
+        )
+        with timed("mail"), MAIL_SEND_SECONDS.time(object_name=self.object_name):
+            message.send()
 
     @cached_property
     def slug(self):
@@ -92,28 +94,32 @@ class PdfExportAndMailMixin(object):
         return output.read()
 
     def write_pdf(self, event, output):
+        import trml2pdf
+        from pypdf import PdfReader, PdfWriter
+
         # get plain pdf from rml
         template = self.select_template(event, "rml")
         rml_content = template.render(self.get_context(event))
-        pdf_content = trml2pdf.parseString(rml_content.encode("utf-8"))
-        print_setup = self.get_print_setup(event)
-
-        # merge with background
-        if print_setup.background:
-            template_pdf = PdfReader(print_setup.background.file)
-            registration_pdf = PdfReader(BytesIO(pdf_content))
-            writer = PdfWriter()
-            # merge pages from both template and registration
-            for i in range(len(registration_pdf.pages)):
-                if i < len(template_pdf.pages):
-                    page = template_pdf.pages[i]
-                    page.merge_page(registration_pdf.pages[i])
-                else:
-                    page = registration_pdf.pages[i]
-                writer.add_page(page)
-            # write result to output
-            writer.write(output)
-        else:
-            # write basic pdf registration to response
-            output.write(pdf_content)
+        with timed("pdf"), PDF_RENDER_SECONDS.time(object_name=self.object_name, event=event):
+            pdf_content = trml2pdf.parseString(rml_content.encode("utf-8"))
+            print_setup = self.get_print_setup(event)
+
+            # merge with background
+            if print_setup.background:
+                template_pdf = PdfReader(print_setup.background.file)
+                registration_pdf = PdfReader(BytesIO(pdf_content))
+                writer = PdfWriter()
+                # merge pages from both template and registration
+                for i in range(len(registration_pdf.pages)):
+                    if i < len(template_pdf.pages):
+                        page = template_pdf.pages[i]
+                        page.merge_page(registration_pdf.pages[i])
+                    else:
+                        page = registration_pdf.pages[i]
+                    writer.add_page(page)
+                # write result to output
+                writer.write(output)
+            else:
+                # write basic pdf registration to response
+                output.write(pdf_content)
         return output
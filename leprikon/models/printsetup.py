@@ -2,7 +2,6 @@ from django.db import models
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from filer.fields.file import FilerFileField
-from pypdf import PdfReader
 from reportlab.lib.pagesizes import A4, portrait
 from reportlab.lib.units import mm
 
@@ -28,6 +27,8 @@ class PrintSetup(models.Model):
 
     @cached_property
     def background_pdf(self):
+        from pypdf import PdfReader
+
         return PdfReader(self.background.file) if self.background else None
 
     @cached_property
@@ -0,0 +1,148 @@
+from collections import defaultdict
+from typing import Callable, Iterable, Optional, TypeVar
+
+from django.db import connection, models, transaction
+
+from .activities import Activity, ActivityAttachment, ActivityTime, ActivityVariant
+from .schoolyear import SchoolYear, SchoolYearDivision
+from .utils import change_year
+
+M = TypeVar("M", bound=models.Model)
+
+ACTIVITY_M2M_FIELDS = ("groups", "age_groups", "target_groups", "leaders", "questions")
+VARIANT_M2M_FIELDS = ("age_groups", "target_groups", "required_resources", "required_resource_groups")
+
+
+def clone(obj: M, **kwargs) -> M:
+    """
+    Create unsaved copy of the object without the primary key (and multi-table inheritance parent links).
+    """
+    values = {
+        field.attname: getattr(obj, field.attname) for field in obj._meta.concrete_fields if not field.primary_key
+    }
+    values.update(kwargs)
+    return type(obj)(**values)
+
+
+def copy_m2m(model: type[models.Model], field_name: str, id_map: dict[int, int]):
+    """
+    Copy many-to-many links of objects given by the keys of id_map
+    to the objects given by the values of id_map with a single bulk insert.
+    """
+    field = model._meta.get_field(field_name)
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    through.objects.bulk_create(
+        through(**{f"{source}_id": id_map[source_id], f"{target}_id": target_id})
+        for source_id, target_id in through.objects.filter(**{f"{source}_id__in": id_map}).values_list(
+            f"{source}_id", f"{target}_id"
+        )
+    )
+
+
+def get_division_map(old_divisions: Iterable[SchoolYearDivision], school_year: SchoolYear) -> dict[int, int]:
+    """
+    Map ids of old school year divisions to ids of the divisions with the same name in the target school year.
+    Missing divisions are copied to the target school year.
+    """
+    existing_divisions = {division.name: division.id for division in school_year.divisions.all()}
+    division_map = {}
+    for old_division in old_divisions:
+        if old_division.name not in existing_divisions:
+            existing_divisions[old_division.name] = old_division.copy_to_school_year(school_year).id
+        division_map[old_division.id] = existing_divisions[old_division.name]
+    return division_map
+
+
+def copy_activities_to_school_year(
+    activities: Iterable[Activity],
+    school_year: SchoolYear,
+    dry_run: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> list[Activity]:
+    """
+    Copy activities (instances of Course, Event or Orderable) to given school year,
+    including their variants, times, attachments and many-to-many relations.
+
+    Apart from inserting the activities (and the variants on databases,
+    which do not return ids from bulk inserts), the number of queries does not depend on the number of activities.
+    With dry_run, all the changes are rolled back.
+    """
+    old_activities = list(activities)
+    total = len(old_activities)
+    old_school_year_ids = {a.id: a.school_year_id for a in old_activities}
+    years = dict(SchoolYear.objects.filter(id__in=set(old_school_year_ids.values())).values_list("id", "year"))
+
+    with transaction.atomic():
+        # activities
+        activity_map: dict[int, Activity] = {}
+        for done, old in enumerate(old_activities, start=1):
+            year_delta = school_year.year - years[old.school_year_id]
+            new = clone(
+                old,
+                school_year_id=school_year.id,
+                public=False,
+                note="",
+                **{name: change_year(getattr(old, name), year_delta) for name in old.copy_year_shifted_fields},
+            )
+            new.save()
+            activity_map[old.id] = new
+            if progress:
+                progress(done, total)
+        activity_id_map = {old_id: new.id for old_id, new in activity_map.items()}
+        for field_name in ACTIVITY_M2M_FIELDS:
+            copy_m2m(Activity, field_name, activity_id_map)
+        school_year.leaders.add(
+            *set(
+                Activity.leaders.through.objects.filter(activity_id__in=activity_id_map).values_list(
+                    "leader_id", flat=True
+                )
+            )
+        )
+
+        # variants
+        old_variants = list(
+            ActivityVariant.objects.filter(activity_id__in=activity_id_map)
+            .select_related("school_year_division__school_year")
+            .prefetch_related("school_year_division__periods")
+        )
+        division_map = get_division_map(
+            {
+                v.school_year_division_id: v.school_year_division for v in old_variants if v.school_year_division
+            }.values(),
+            school_year,
+        )
+        new_variants = []
+        for old_variant in old_variants:
+            year_delta = school_year.year - years[old_school_year_ids[old_variant.activity_id]]
+            new_variants.append(
+                clone(
+                    old_variant,
+                    activity_id=activity_id_map[old_variant.activity_id],
+                    school_year_division_id=division_map.get(old_variant.school_year_division_id),
+                    reg_from=change_year(old_variant.reg_from, year_delta),
+                    reg_to=change_year(old_variant.reg_to, year_delta),
+                )
+            )
+        if connection.features.can_return_rows_from_bulk_insert:
+            ActivityVariant.objects.bulk_create(new_variants)
+        else:
+            for new_variant in new_variants:
+                new_variant.save()
+        variant_id_map = {old.id: new.id for old, new in zip(old_variants, new_variants)}
+        for field_name in VARIANT_M2M_FIELDS:
+            copy_m2m(ActivityVariant, field_name, variant_id_map)
+
+        # times and attachments
+        related_objects = defaultdict(list)
+        for Model in (ActivityTime, ActivityAttachment):
+            for obj in Model.objects.filter(activity_id__in=activity_id_map):
+                related_objects[Model].append(clone(obj, activity_id=activity_id_map[obj.activity_id]))
+        for Model, objects in related_objects.items():
+            Model.objects.bulk_create(objects)
+
+        if dry_run:
+            transaction.set_rollback(True)
+
+    return list(activity_map.values())
@@ -1,31 +1,48 @@
 from datetime import date
+from time import time
 
 from cms.models import CMSPlugin
+from django.core.cache import cache
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.dispatch import receiver
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
+from ..conf import settings
 from ..utils import comma_separated
 from .startend import StartEndMixin
 from .utils import change_year
 
+CURRENT_SCHOOL_YEAR_CACHE_KEY = "leprikon:current_school_year:{}"
+SCHOOL_YEAR_VERSION_KEY = "leprikon:school_year_version"
+
 
 class SchoolYearManager(models.Manager):
     def get_current(self):
-        # by default use last active year
-        school_year = self.filter(active=True).order_by("-year").first()
+        # the current school year is cached under the version valid before it was read from the database,
+        # so that a value read before a school year changed is never stored under the new version
+        version = cache.get_or_set(SCHOOL_YEAR_VERSION_KEY, time, None)
+        cache_key = CURRENT_SCHOOL_YEAR_CACHE_KEY.format(version)
+        school_year = cache.get(cache_key)
         if school_year is None:
-            # Create or activate current year
-            if date.today().month < 7:
-                year = date.today().year - 1
-            else:
-                year = date.today().year
-            school_year = SchoolYear.objects.get_or_create(year=year)[0]
-            school_year.active = True
-            school_year.save()
+            # by default use last active year
+            school_year = self.filter(active=True).order_by("-year").first()
+            if school_year is None:
+                # Create or activate current year
+                if date.today().month < 7:
+                    year = date.today().year - 1
+                else:
+                    year = date.today().year
+                school_year = SchoolYear.objects.get_or_create(year=year)[0]
+                school_year.active = True
+                school_year.save()
+            cache.set(cache_key, school_year, settings.LEPRIKON_SCHOOL_YEAR_CACHE_TIMEOUT)
         return school_year
 
+    def clear_cache(self):
+        cache.set(SCHOOL_YEAR_VERSION_KEY, time(), None)
+
 
 class SchoolYear(models.Model):
     year = models.IntegerField(
@@ -154,3 +171,9 @@ class SchoolYearBlockPlugin(CMSPlugin):
 
     def copy_relations(self, oldinstance):
         self.school_years.set(oldinstance.school_years.all())
+
+
+@receiver(models.signals.post_save, sender=SchoolYear)
+@receiver(models.signals.post_delete, sender=SchoolYear)
+def school_year_invalidate_cache(**kwargs):
+    transaction.on_commit(SchoolYear.objects.clear_cache)
@@ -5,7 +5,7 @@ from decimal import Decimal
 from typing import Any, Union
 
 from django.core.exceptions import ValidationError
-from django.db.models import Model, QuerySet
+from django.db.models import IntegerField, Model, QuerySet, Subquery
 from django.utils.functional import cached_property, lazy
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
@@ -293,3 +293,13 @@ def copy_related_objects(target: Model, **kwargs: QuerySet):
             obj.pk = None
             setattr(obj, remote_field_name, target)
         qs.model.objects.bulk_create(related_objects)
+
+
+class SubqueryCount(Subquery):
+    """
+    Number of rows returned by the subquery.
+    Use this instead of Count() to avoid multiplying rows by joins in the outer query.
+    """
+
+    template = "(SELECT COUNT(*) FROM (%(subquery)s) _count)"
+    output_field = IntegerField()
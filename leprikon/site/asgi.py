@@ -0,0 +1,37 @@
+"""
+ASGI config for leprikon.site project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+from leprikon.api.asgi import CalendarASGIHandler, is_calendar_path
+from leprikon.conf import settings
+
+os.environ.setdefault(
+    "DJANGO_SETTINGS_MODULE",
+    "{}.settings".format(os.environ.get("SITE_MODULE", "leprikon.site")),
+)
+
+django_application = get_asgi_application()
+
+calendar_application = CalendarASGIHandler()
+
+
+async def application(scope, receive, send):
+    # the calendar endpoints are served without blocking the thread running the sync code of other requests
+    if scope["type"] == "http" and is_calendar_path(scope["path"][len(scope.get("root_path", "")) :]):
+        return await calendar_application(scope, receive, send)
+    return await django_application(scope, receive, send)
+
+
+if settings.LEPRIKON_WARM_UP:
+    from leprikon.site.warmup import warm_up
+
+    warm_up()
@@ -96,6 +96,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "cms.middleware.utils.ApphookReloadMiddleware",
+    "leprikon.middleware.LeprikonInstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -120,6 +121,10 @@ CORS_ALLOWED_ORIGINS = [
 CRON_CLASSES = [
     "leprikon.cronjobs.SendPaymentRequest",
 ]
+DJANGO_CRON_LOCK_BACKEND = "leprikon.cronjobs.DatabaseLock"
+if "DJANGO_CRON_DELETE_LOGS_OLDER_THAN" in os.environ:
+    DJANGO_CRON_DELETE_LOGS_OLDER_THAN = int(os.environ["DJANGO_CRON_DELETE_LOGS_OLDER_THAN"])
+LEPRIKON_SCHEDULER_INTERVAL = int(os.environ.get("LEPRIKON_SCHEDULER_INTERVAL", 60))
 
 CRON_SEND_PAYMENT_REQUEST_TIME = os.environ.get("CRON_SEND_PAYMENT_REQUEST_TIME", "8:00")
 
@@ -365,6 +370,8 @@ if "CACHE_LOCATION" in os.environ:
         }
     if "CACHE_KEY_PREFIX" in os.environ:
         CACHES["default"]["KEY_PREFIX"] = os.environ["CACHE_KEY_PREFIX"]
+# the results of reports computed in background are shared through the cache (requires CACHE_LOCATION)
+LEPRIKON_REPORT_ASYNC = os.environ.get("LEPRIKON_REPORT_ASYNC", "").lower() in ("1", "y", "yes", "t", "true")
 
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
 SESSION_CACHE_ALIAS = "default"
@@ -448,6 +455,21 @@ COUNTRIES_FIRST = ["CZ", "SK"]
 if "LEPRIKON_VARIABLE_SYMBOL_EXPRESSION" in os.environ:
     LEPRIKON_VARIABLE_SYMBOL_EXPRESSION = os.environ.get("LEPRIKON_VARIABLE_SYMBOL_EXPRESSION")
 
+LEPRIKON_INSTRUMENTATION = os.environ.get("LEPRIKON_INSTRUMENTATION", "").lower() in ("1", "y", "yes", "t", "true")
+if "LEPRIKON_SLOW_REQUEST_THRESHOLD" in os.environ:
+    LEPRIKON_SLOW_REQUEST_THRESHOLD = float(os.environ["LEPRIKON_SLOW_REQUEST_THRESHOLD"])
+if "LEPRIKON_SLOW_REQUEST_SAMPLE_RATE" in os.environ:
+    LEPRIKON_SLOW_REQUEST_SAMPLE_RATE = float(os.environ["LEPRIKON_SLOW_REQUEST_SAMPLE_RATE"])
+
+if "LEPRIKON_API_ASYNC_WORKERS" in os.environ:
+    LEPRIKON_API_ASYNC_WORKERS = int(os.environ["LEPRIKON_API_ASYNC_WORKERS"])
+
+LEPRIKON_WARM_UP = os.environ.get("LEPRIKON_WARM_UP", "").lower() in ("1", "y", "yes", "t", "true")
+
+LEPRIKON_METRICS = os.environ.get("LEPRIKON_METRICS", "").lower() in ("1", "y", "yes", "t", "true")
+LEPRIKON_METRICS_DIR = os.environ.get("LEPRIKON_METRICS_DIR", os.path.join(BASE_DIR, "run", "metrics"))
+LEPRIKON_METRICS_TOKEN = os.environ.get("LEPRIKON_METRICS_TOKEN")
+
 LEPRIKON_SHOW_ACTIVITY_CODE = os.environ.get("LEPRIKON_SHOW_ACTIVITY_CODE", "").lower() in (
     "1",
     "y",
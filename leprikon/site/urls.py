@@ -21,10 +21,13 @@ from django.contrib.sites.models import Site
 from django.urls import include, path
 from django.views.generic.base import RedirectView
 
+from leprikon.views.metrics import metrics
+
 try:
     urlpatterns = [
         path("favicon.ico", RedirectView.as_view(url="/static/favicon.ico")),
         path("admin/", admin.site.urls),
+        path("metrics", metrics),
         path("pays/", include("django_pays.urls")),
         path("social/", include("social_django.urls")),
         path("verified-email-field/", include("verified_email_field.urls")),
@@ -0,0 +1,78 @@
+"""
+Warm up the process before forking the workers (gunicorn --preload),
+so that the workers share the loaded code and caches with the master process (copy-on-write).
+"""
+
+import gc
+import logging
+import os
+from time import perf_counter
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.urls import get_resolver
+from django.utils import translation
+
+from ..conf import settings
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = (".html", ".txt", ".xml", ".rml")
+
+
+def get_template_names(engine: DjangoTemplates) -> set[str]:
+    names = set()
+    for loader in engine.engine.template_loaders:
+        for template_dir in loader.get_dirs():
+            for root, dirs, files in os.walk(template_dir):
+                names.update(
+                    os.path.relpath(os.path.join(root, name), template_dir)
+                    for name in files
+                    if name.endswith(TEMPLATE_EXTENSIONS)
+                )
+    return names
+
+
+def compile_templates() -> int:
+    count = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for name in get_template_names(engine):
+            try:
+                # the cached loader keeps the compiled template
+                engine.get_template(name)
+                count += 1
+            except Exception:
+                # some of the third party templates are not meant to be used in this project
+                logger.debug("Failed to compile template %s during warm-up.", name, exc_info=True)
+    return count
+
+
+def warm_up():
+    start = perf_counter()
+    # load all the views and translation catalogs
+    get_resolver().reverse_dict
+    for language_code, language_name in settings.LANGUAGES:
+        with translation.override(language_code):
+            translation.gettext("")
+    # load the static files manifest
+    getattr(staticfiles_storage, "hashed_files", None)
+    templates_count = compile_templates()
+    try:
+        from ..models.leprikonsite import LeprikonSite
+
+        LeprikonSite.objects.get_current()
+    except DatabaseError:
+        logger.warning("Failed to load the current site during warm-up.", exc_info=True)
+    # the workers must not share the connections of the master process
+    connections.close_all()
+    for cache in caches.all():
+        cache.close()
+    # keep the loaded objects out of the garbage collection, which would touch (and copy) their memory pages
+    gc.collect()
+    gc.freeze()
+    logger.info("Warmed up in %.2f seconds (%s templates compiled).", perf_counter() - start, templates_count)
@@ -11,9 +11,16 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from leprikon.conf import settings
+
 os.environ.setdefault(
     "DJANGO_SETTINGS_MODULE",
     "{}.settings".format(os.environ.get("SITE_MODULE", "leprikon.site")),
 )
 
 application = get_wsgi_application()
+
+if settings.LEPRIKON_WARM_UP:
+    from leprikon.site.warmup import warm_up
+
+    warm_up()
@@ -5,6 +5,7 @@ function initializeCalendar(
     duration,
     unavailableDatesUrl,
     businessHoursUrl,
+    holdUrl,
     selectedEventTimeLabel,
     locale,
     buttonText,
@@ -63,6 +64,35 @@ function initializeCalendar(
         });
     }
 
+    function holdSelectedTime(start) {
+      if (!holdUrl) return;
+      var csrfInput = document.querySelector("input[name=csrfmiddlewaretoken]");
+      fetch(holdUrl, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          "X-CSRFToken": csrfInput ? csrfInput.value : "",
+        },
+        body: JSON.stringify({
+          start_date: startDateInput.value,
+          start_time: startTimeInput.value,
+        }),
+      }).then(res => {
+        if (res.status === 409) {
+          // the time has just been taken by someone else
+          var existingEvent = calendar.getEventById("selected-time");
+          if (existingEvent) {
+            existingEvent.remove();
+          }
+          startDateInput.value = "";
+          startTimeInput.value = "";
+          selectedTimeInput.value = "";
+          calendar.refetchEvents();
+          calendar.changeView(calendar.view.type, start);
+        }
+      });
+    }
+
     function setSelectedTime(start, end) {
       // remove existing event
       var existingEvent = calendar.getEventById("selected-time");
@@ -84,6 +114,7 @@ function initializeCalendar(
 
       // set start date and time inputs
       setFormValues(start, end);
+      holdSelectedTime(start);
     }
 
     function isAvailableDate(dateStr) {
@@ -222,6 +253,7 @@ function initializeCalendar(
 
         if (isAvailableTime(start, end)) {
           setFormValues(start, end);
+          holdSelectedTime(start);
         } else {
           info.revert();
         }
@@ -1,4 +1,8 @@
+import hashlib
+import json
 import re
+from threading import Thread
+from time import sleep, time
 from traceback import print_exc
 
 import requests
@@ -135,7 +139,7 @@ def registration_links(context, activity: Activity):
             date_format(timezone.localtime(source.reg_to), "DATETIME_FORMAT")
         )
         if source.reg_to > now:
-            context["registration_end_in"] = (source.reg_to - now).seconds
+            context["registration_end"] = int(source.reg_to.timestamp() * 1000)
             context["registration_ends_message"] = _("Registering will end on {}.").format(
                 date_format(timezone.localtime(source.reg_to), "DATETIME_FORMAT")
             )
@@ -143,7 +147,7 @@ def registration_links(context, activity: Activity):
         else:
             context["registration_message"] = context["registration_ended_message"]
     if source.reg_from and source.reg_from > now:
-        context["registration_start_in"] = (source.reg_from - now).seconds
+        context["registration_start"] = int(source.reg_from.timestamp() * 1000)
         context["registration_starts_message"] = _("Registering will start on {}.").format(
             date_format(timezone.localtime(source.reg_from), "DATETIME_FORMAT")
         )
@@ -158,6 +162,42 @@ def school_year_form(context):
     return context
 
 
+UPSTREAM_POLL_INTERVAL = 0.1
+
+
+def get_upstream_cache():
+    try:
+        return caches["upstream_pages"]
+    except InvalidCacheBackendError:
+        return caches["default"]
+
+
+def fetch_upstream_fragment(url, xpath, replacements) -> str:
+    content = requests.get(url, timeout=settings.LEPRIKON_UPSTREAM_TIMEOUT).content
+    for replacement in replacements:
+        try:
+            replacement = replacement.encode("utf-8")
+            pattern, repl = replacement[1:-1].split(replacement[:1])
+        except (IndexError, ValueError):
+            print_exc()
+        else:
+            content = re.sub(pattern, repl, content)
+    return b"".join(tostring(node) for node in fromstring(content).xpath(xpath)).decode()
+
+
+def refresh_upstream_fragment(key, url, xpath, replacements):
+    cache = get_upstream_cache()
+    try:
+        fragment = fetch_upstream_fragment(url, xpath, replacements)
+        cache.set(
+            key, (time() + settings.LEPRIKON_UPSTREAM_MAX_AGE, fragment), settings.LEPRIKON_UPSTREAM_STALE_MAX_AGE
+        )
+    except Exception:
+        print_exc()
+    finally:
+        cache.delete(f"{key}:lock")
+
+
 @register.simple_tag
 def upstream(url, xpath, *replacements):
     """
@@ -166,32 +206,40 @@ def upstream(url, xpath, *replacements):
 
     Following example includes tag <nav> (with all it's content) from https://example.com:
 
-        {% load cache leprikon_tags %}
-        {% cache 300 menu %}{% upstream 'https://example.com/' '//nav' %}{% endcache %}
-        {% cache 300 menu %}{% upstream 'https://example.com/' '//nav' '|<br>|<br/>|' %}{% endcache %}
+        {% load leprikon_tags %}
+        {% upstream 'https://example.com/' '//nav' %}
+        {% upstream 'https://example.com/' '//nav' '|<br>|<br/>|' %}
+
+    The extracted snippet is cached, so there is no need to wrap the tag with {% cache %}.
+    Once it gets older than LEPRIKON_UPSTREAM_MAX_AGE, it is still used while a single background thread
+    fetches the fresh one. If there is no snippet in the cache, the request waits for the process fetching it.
     """
-    try:
-        cache = caches["upstream_pages"]
-    except InvalidCacheBackendError:
-        cache = caches["default"]
-    try:
-        content = cache.get(url)
-        if content is None:
-            content = requests.get(url).content
-            cache.set(url, content, 60)
-        for replacement in replacements:
-            try:
-                replacement = replacement.encode("utf-8")
-                pattern, repl = replacement[1:-1].split(replacement[:1])
-            except (IndexError, ValueError):
-                print_exc()
+    cache = get_upstream_cache()
+    key = "leprikon:upstream:" + hashlib.sha1(json.dumps([url, xpath, replacements]).encode()).hexdigest()
+    lock = f"{key}:lock"
+    fresh_until, fragment = cache.get(key) or (None, None)
+    if fresh_until is None or fresh_until < time():
+        # only one process fetches the upstream page at the time
+        if cache.add(lock, True, settings.LEPRIKON_UPSTREAM_TIMEOUT * 2):
+            if fragment is None:
+                refresh_upstream_fragment(key, url, xpath, replacements)
+                fragment = (cache.get(key) or (None, None))[1]
             else:
-                content = re.sub(pattern, repl, content)
-        result_bytes = b"".join(tostring(node) for node in fromstring(content).xpath(xpath))
-        return mark_safe(result_bytes.decode())
-    except Exception:
-        print_exc()
-        return ""
+                Thread(target=refresh_upstream_fragment, args=(key, url, xpath, replacements), daemon=True).start()
+        elif fragment is None:
+            # wait for the process fetching the upstream page
+            deadline = time() + settings.LEPRIKON_UPSTREAM_TIMEOUT * 2
+            while fragment is None and cache.get(lock) and time() < deadline:
+                sleep(UPSTREAM_POLL_INTERVAL)
+                fragment = (cache.get(key) or (None, None))[1]
+            fragment = fragment or (cache.get(key) or (None, None))[1]
+            if fragment is None:
+                # the other process failed, fetch the upstream page synchronously
+                try:
+                    fragment = fetch_upstream_fragment(url, xpath, replacements)
+                except Exception:
+                    print_exc()
+    return mark_safe(fragment or "")
 
 
 class URLWithBackNode(template.base.Node):
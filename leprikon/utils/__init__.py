@@ -2,11 +2,15 @@ import locale
 import re
 import unicodedata
 import zlib
+from contextlib import contextmanager
 from datetime import date
 from decimal import Decimal
+from random import randrange
 from typing import Iterable, Union
 from urllib.parse import parse_qs, urlencode
+from uuid import uuid4
 
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import IntegrityError, transaction
 from django.urls import reverse_lazy as reverse
@@ -293,6 +297,35 @@ def merge_users(source, target):
     source.delete()
 
 
+@contextmanager
+def admission_slot(key: str, limit: int | None, timeout: int):
+    """
+    Limit the number of concurrently processed requests sharing the same key
+    across all the processes using the same cache.
+    Yields True if the request may be processed, or False if all the slots are taken.
+    Each slot is a separate cache key expiring after the timeout,
+    so that the slot of a crashed process is released, while the other slots are kept.
+    """
+    if not limit:
+        yield True
+        return
+    token = uuid4().hex
+    # start with a random slot to spread the concurrent requests over the slots
+    first_slot = randrange(limit)
+    slot_key = None
+    for i in range(limit):
+        candidate_key = f"{key}:{(first_slot + i) % limit}"
+        if cache.add(candidate_key, token, timeout):
+            slot_key = candidate_key
+            break
+    try:
+        yield slot_key is not None
+    finally:
+        # the slot may have expired and been taken by another request in the meantime
+        if slot_key is not None and cache.get(slot_key) == token:
+            cache.delete(slot_key)
+
+
 def spayd(*items):
     s = "SPD*1.0*" + "*".join(
         "%s:%s" % (k, unicodedata.normalize("NFKD", str(v).replace("*", "")).encode("ascii", "ignore").upper().decode())
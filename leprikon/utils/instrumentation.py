@@ -0,0 +1,132 @@
+import re
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Optional
+
+from django.db import connections
+
+whitespace = re.compile(r"\s+")
+placeholders_list = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")
+
+
+def normalize_sql(sql: str) -> str:
+    # the same statements with different number of values in the IN (...) lists are grouped together
+    return placeholders_list.sub("(...)", whitespace.sub(" ", sql)).strip()
+
+
+class Timing:
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def add(self, duration: float):
+        self.count += 1
+        self.duration += duration
+
+
+class RequestMetrics:
+    """
+    Number and duration of SQL queries (grouped by normalized statement) and other timed sections of a request
+    """
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.end = None
+        self.timings: dict[str, Timing] = defaultdict(Timing)
+        self.queries: dict[str, Timing] = defaultdict(Timing)
+
+    @property
+    def duration(self) -> float:
+        return (self.end or perf_counter()) - self.start
+
+    def add(self, name: str, duration: float):
+        self.timings[name].add(duration)
+
+    def add_query(self, sql: str, duration: float):
+        self.timings["sql"].add(duration)
+        self.queries[normalize_sql(sql)].add(duration)
+
+    def get_slowest_queries(self, limit: int = 10) -> list[tuple[str, Timing]]:
+        return sorted(self.queries.items(), key=lambda item: item[1].duration, reverse=True)[:limit]
+
+    def get_server_timing(self) -> str:
+        return ", ".join(
+            [
+                f'{name};dur={timing.duration * 1000:.1f};desc="{name} ({timing.count}x)"'
+                for name, timing in self.timings.items()
+            ]
+            + [f"total;dur={self.duration * 1000:.1f}"]
+        )
+
+    def get_report(self) -> str:
+        sql = self.timings["sql"]
+        lines = [
+            f"{self.duration:.3f}s total, "
+            + ", ".join(f"{name} {timing.count}x {timing.duration:.3f}s" for name, timing in self.timings.items()),
+            f"{len(self.queries)} distinct of {sql.count} SQL queries, slowest:",
+        ]
+        lines.extend(
+            f"  {timing.count}x {timing.duration:.3f}s {statement}" for statement, timing in self.get_slowest_queries()
+        )
+        return "\n".join(lines)
+
+
+_request_metrics: ContextVar[Optional[RequestMetrics]] = ContextVar("leprikon_request_metrics", default=None)
+
+
+def get_request_metrics() -> Optional[RequestMetrics]:
+    return _request_metrics.get()
+
+
+@contextmanager
+def timed(name: str):
+    """
+    Add the duration of the block to the metrics of current request (if any).
+    """
+    metrics = _request_metrics.get()
+    if metrics is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, perf_counter() - start)
+
+
+@contextmanager
+def queries_scope(metrics: RequestMetrics):
+    """
+    Add the SQL queries of the current thread run within the context to the given metrics.
+    """
+
+    def execute_wrapper(execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics.add_query(sql, perf_counter() - start)
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(execute_wrapper))
+        yield
+
+
+@contextmanager
+def request_metrics_scope():
+    """
+    Collect metrics of all the code running within the context including all the SQL queries.
+    """
+    metrics = RequestMetrics()
+    token = _request_metrics.set(metrics)
+    try:
+        with queries_scope(metrics):
+            yield metrics
+    finally:
+        metrics.end = perf_counter()
+        _request_metrics.reset(token)
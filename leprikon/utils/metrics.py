@@ -0,0 +1,286 @@
+"""
+Application metrics exposed in the Prometheus text format.
+
+Each process collects its own samples. With LEPRIKON_METRICS_DIR, every process stores its samples
+in its own file within the directory (at most once per WRITE_INTERVAL) and the samples of all the processes
+are summed up when collected, so that the metrics of all gunicorn workers are served by any of them.
+When collected, the files of processes, which are no longer running, are merged into a single file,
+so that the directory only contains one file per running process and one more.
+The directory must not be shared by more hosts.
+"""
+
+import atexit
+import fcntl
+import json
+import os
+from collections import defaultdict
+from contextlib import contextmanager
+from glob import glob
+from math import inf
+from tempfile import NamedTemporaryFile
+from threading import Lock, Timer
+from time import monotonic, perf_counter
+from typing import Optional
+from uuid import uuid4
+
+from ..conf import settings
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# max number of seconds before the samples of a process are written to its file
+WRITE_INTERVAL = 1
+# file with the samples of processes, which are no longer running
+ARCHIVE_FILENAME = "archive.json"
+
+SampleKey = tuple[str, tuple[tuple[str, str], ...]]
+
+
+def format_value(value: float) -> str:
+    if value == inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+def format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{%s}" % ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in labels
+    )
+
+
+def sample_sort_key(item: tuple[SampleKey, float]):
+    # histogram buckets are sorted by their numeric bounds
+    (name, labels), _ = item
+    return name, tuple((label, float(value) if label == "le" else value) for label, value in labels)
+
+
+def read_samples(filename: str, samples: dict[SampleKey, float]):
+    try:
+        with open(filename) as f:
+            for name, labels, value in json.load(f):
+                samples[name, tuple(tuple(label) for label in labels)] += value
+    except (OSError, ValueError):
+        pass
+
+
+def write_samples(filename: str, samples: dict[SampleKey, float]):
+    with NamedTemporaryFile("w", dir=os.path.dirname(filename), suffix=".tmp", delete=False) as f:
+        json.dump([[name, labels, value] for (name, labels), value in samples.items()], f)
+    os.replace(f.name, filename)
+
+
+def is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict[str, "Metric"] = {}
+        self.samples: dict[SampleKey, float] = defaultdict(float)
+        self.lock = Lock()
+        self.pid = os.getpid()
+        self.filename: Optional[str] = None
+        self.written_at = -inf
+        self.timer: Optional[Timer] = None
+        atexit.register(self.flush)
+
+    def register(self, metric: "Metric"):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self.metrics[metric.name] = metric
+
+    def add(self, increments: dict[SampleKey, float]):
+        if not settings.LEPRIKON_METRICS:
+            return
+        with self.lock:
+            if self.pid != os.getpid():
+                # forked process must not report the samples of its parent again
+                self.pid = os.getpid()
+                self.filename = None
+                self.written_at = -inf
+                self.timer = None
+                self.samples.clear()
+            for key, value in increments.items():
+                self.samples[key] += value
+            if settings.LEPRIKON_METRICS_DIR:
+                delay = self.written_at + WRITE_INTERVAL - monotonic()
+                if delay <= 0:
+                    self.write()
+                elif self.timer is None:
+                    # write the samples once the interval passes
+                    self.timer = Timer(delay, self.flush)
+                    self.timer.daemon = True
+                    self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            if self.pid == os.getpid() and self.samples and settings.LEPRIKON_METRICS_DIR:
+                self.write()
+
+    def write(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.filename is None:
+            os.makedirs(settings.LEPRIKON_METRICS_DIR, exist_ok=True)
+            self.filename = os.path.join(settings.LEPRIKON_METRICS_DIR, f"{self.pid}-{uuid4().hex}.json")
+        write_samples(self.filename, self.samples)
+        self.written_at = monotonic()
+
+    def archive(self):
+        """
+        Merge the files of processes, which are no longer running, into the archive file.
+        """
+        os.makedirs(settings.LEPRIKON_METRICS_DIR, exist_ok=True)
+        with open(os.path.join(settings.LEPRIKON_METRICS_DIR, "archive.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            filenames = [
+                filename
+                for filename in glob(os.path.join(settings.LEPRIKON_METRICS_DIR, "*-*.json"))
+                if not is_running(int(os.path.basename(filename).split("-", 1)[0]))
+            ]
+            if filenames:
+                archive_filename = os.path.join(settings.LEPRIKON_METRICS_DIR, ARCHIVE_FILENAME)
+                samples: dict[SampleKey, float] = defaultdict(float)
+                for filename in [archive_filename] + filenames:
+                    read_samples(filename, samples)
+                write_samples(archive_filename, samples)
+                for filename in filenames:
+                    os.remove(filename)
+
+    def collect(self) -> dict[SampleKey, float]:
+        if not settings.LEPRIKON_METRICS_DIR:
+            with self.lock:
+                return dict(self.samples)
+        self.flush()
+        self.archive()
+        samples: dict[SampleKey, float] = defaultdict(float)
+        for filename in glob(os.path.join(settings.LEPRIKON_METRICS_DIR, "*.json")):
+            read_samples(filename, samples)
+        return samples
+
+    def render(self) -> str:
+        samples_by_metric = defaultdict(list)
+        for (name, labels), value in sorted(self.collect().items(), key=sample_sort_key):
+            samples_by_metric[name.rsplit(":", 1)[0]].append((name.replace(":", "_"), labels, value))
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in samples_by_metric[metric.name]:
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    type: str
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.registry = registry
+        registry.register(self)
+
+    def get_labels(self, labels: dict[str, str]) -> tuple[tuple[str, str], ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} requires labels {', '.join(self.labelnames)}.")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        self.registry.add({(f"{self.name}:total", self.get_labels(labels)): amount})
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets) + (inf,)
+
+    def observe(self, value: float, **labels):
+        labels = self.get_labels(labels)
+        increments = {
+            (f"{self.name}:bucket", labels + (("le", format_value(bucket)),)): int(value <= bucket)
+            for bucket in self.buckets
+        }
+        increments[f"{self.name}:sum", labels] = value
+        increments[f"{self.name}:count", labels] = 1
+        self.registry.add(increments)
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of the block (may be used as a decorator, too).
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, **labels)
+
+
+REGISTRATION_SUBMISSIONS = Counter(
+    "leprikon_registration_submissions",
+    "Number of submitted registration forms.",
+    ("activity_type", "result"),
+)
+REGISTRATION_SUBMISSION_SECONDS = Histogram(
+    "leprikon_registration_submission_seconds",
+    "Time to process submitted registration forms.",
+    ("activity_type",),
+)
+API_REQUEST_SECONDS = Histogram(
+    "leprikon_api_request_seconds",
+    "Time to compute availability API responses.",
+    ("endpoint",),
+)
+PDF_RENDER_SECONDS = Histogram(
+    "leprikon_pdf_render_seconds",
+    "Time to render PDF documents.",
+    ("object_name", "event"),
+)
+MAIL_SEND_SECONDS = Histogram(
+    "leprikon_mail_send_seconds",
+    "Time to send emails.",
+    ("object_name",),
+)
+BANK_TRANSACTIONS = Counter(
+    "leprikon_bank_transactions",
+    "Number of imported bank transactions.",
+    ("result",),
+)
+BANK_TRANSACTION_SECONDS = Histogram(
+    "leprikon_bank_transaction_seconds",
+    "Time to process imported bank transactions.",
+)
+CRON_JOB_SECONDS = Histogram(
+    "leprikon_cron_job_seconds",
+    "Duration of cron jobs.",
+    ("job",),
+)
+CRON_JOB_FAILURES = Counter(
+    "leprikon_cron_job_failures",
+    "Number of failed cron jobs.",
+    ("job",),
+)
+REPORT_SECONDS = Histogram(
+    "leprikon_report_seconds",
+    "Time to compute reports.",
+    ("report",),
+)
@@ -1,7 +1,8 @@
 from typing import List, Optional
 
 from cms.views import details as cms_view_details
-from django.core.exceptions import PermissionDenied
+from django.contrib import messages
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.db.models import F, Q
 from django.forms import Form
 from django.http import HttpResponse
@@ -10,6 +11,7 @@ from django.urls import reverse_lazy as reverse
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 
+from ..conf import settings
 from ..forms.activities import (
     ActivityFilterForm,
     ActivityForm,
@@ -25,13 +27,15 @@ from ..models.activities import (
     Payment,
     ReceivedPayment,
     Registration,
+    RegistrationParticipant,
     ReturnedPayment,
 )
 from ..models.courses import Course
 from ..models.events import Event
 from ..models.orderables import Orderable
 from ..models.registrationlink import RegistrationLink
-from ..utils import reverse_with_back
+from ..utils import admission_slot, reverse_with_back
+from ..utils.metrics import REGISTRATION_SUBMISSION_SECONDS, REGISTRATION_SUBMISSIONS
 from .generic import ConfirmUpdateView, CreateView, DetailView, FilteredListView, ListView, UpdateView
 
 
@@ -173,6 +177,20 @@ class ActivityRegistrationsView(ActivityTypeMixin, DetailView):
             qs = qs.filter(leaders=self.request.leader)
         return qs
 
+    def get_context_data(self, **kwargs):
+        # the presences of all the listed participants are loaded at once
+        RegistrationParticipant.prefetch_presences(
+            participant
+            for registrations in (
+                self.object.all_approved_registrations,
+                self.object.all_unapproved_registrations,
+                self.object.all_inactive_registrations,
+            )
+            for registration in registrations
+            for participant in registration.activityregistration.all_participants
+        )
+        return super().get_context_data(**kwargs)
+
 
 class ActivityUpdateView(ActivityTypeMixin, UpdateView):
     form_class = ActivityForm
@@ -240,6 +258,36 @@ class RegistrationFormBaseView(CreateView):
             self.activity_variant = self.available_variants[0]
         return super().dispatch(request, **kwargs)
 
+    def post(self, request, *args, **kwargs):
+        with admission_slot(
+            "leprikon:registration_admission",
+            settings.LEPRIKON_REGISTRATION_ADMISSION_LIMIT,
+            settings.LEPRIKON_REGISTRATION_ADMISSION_TIMEOUT,
+        ) as admitted:
+            if admitted:
+                return super().post(request, *args, **kwargs)
+        # render the submitted form again, so that the user may simply submit it later
+        self.object = None
+        messages.warning(
+            request,
+            _("Too many registrations are being processed right now. Please, submit the form again in a moment."),
+        )
+        response = self.render_to_response(self.get_context_data(form=self.get_form()), status=503)
+        response["Retry-After"] = 5
+        return response
+
+    def form_valid(self, form):
+        with REGISTRATION_SUBMISSION_SECONDS.time(activity_type=self.activity_type.model):
+            try:
+                response = super().form_valid(form)
+            except ValidationError as e:
+                REGISTRATION_SUBMISSIONS.inc(activity_type=self.activity_type.model, result="rejected")
+                for message in e.messages:
+                    messages.error(self.request, message)
+                return self.form_invalid(form)
+        REGISTRATION_SUBMISSIONS.inc(activity_type=self.activity_type.model, result="accepted")
+        return response
+
     def get_title(self):
         return _("Registration for {activity_type} {activity}").format(
             activity_type=self.activity_type.name_akuzativ,
@@ -0,0 +1,18 @@
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from ..conf import settings
+from ..utils.metrics import REGISTRY
+
+
+def metrics(request):
+    """
+    Application metrics in the Prometheus text format
+    """
+    if not settings.LEPRIKON_METRICS:
+        raise Http404()
+    if settings.LEPRIKON_METRICS_TOKEN and not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {settings.LEPRIKON_METRICS_TOKEN}"
+    ):
+        return HttpResponse(status=401)
+    return HttpResponse(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
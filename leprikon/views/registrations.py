@@ -24,7 +24,6 @@ class RegistrationsListView(FilteredListView):
         if self.form.cleaned_data.get("q"):
             for word in self.form.cleaned_data["q"].split():
                 qs = qs.filter(Q(activity__name__icontains=word) | Q(activity__description__icontains=word))
-        qs = qs.distinct()
         if self.form.cleaned_data.get("not_paid"):
-            qs = [reg for reg in qs if reg.payment_status.amount_due]
+            qs = qs.not_paid()
         return qs
@@ -1,8 +1,6 @@
 from collections import namedtuple
 from itertools import chain
 
-from django.template.response import TemplateResponse
-from django.urls import reverse_lazy as reverse
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
@@ -10,50 +8,44 @@ from ...forms.reports.debtors import DebtorsForm
 from ...models.courses import CourseRegistration
 from ...models.events import EventRegistration
 from ...models.orderables import OrderableRegistration
-from ...views.generic import FormView
+from .runner import ReportView
 
+# module level classes, so that the reports can be pickled into the cache
+ReportItem = namedtuple("ReportItem", ("registration", "status"))
 
-class ReportDebtorsView(FormView):
-    form_class = DebtorsForm
-    template_name = "leprikon/reports/debtors.html"
-    title = _("Debtors list")
-    submit_label = _("Show")
-    back_url = reverse("leprikon:report_list")
 
-    ReportItem = namedtuple("ReportItem", ("registration", "status"))
+class Report(list):
+    @cached_property
+    def sum(self):
+        return sum(item.status for item in self)
 
-    class Report(list):
-        @cached_property
-        def sum(self):
-            return sum(item.status for item in self)
 
-    def form_valid(self, form):
-        context = form.cleaned_data
-        context["form"] = form
-        context["reports"] = {}
-        context["sum"] = 0
+class ReportDebtorsView(ReportView):
+    form_class = DebtorsForm
+    template_name = "leprikon/reports/debtors.html"
+    title = _("Debtors list")
 
+    def get_report_data(self, cleaned_data):
+        reports = {}
         for reg in chain.from_iterable(
             qs.filter(
                 activity__school_year=self.request.school_year,
-                approved__date__lte=context["date"],
+                approved__date__lte=cleaned_data["date"],
             )
-            .prefetch_related(
-                "discounts",
-                "received_payments",
-                "returned_payments",
-            )
-            .select_related("user")
+            .with_payment_status_data()
+            .select_related("activity__school_year", "group", "user")
+            .prefetch_related("participants")
             for qs in (
-                CourseRegistration.objects.prefetch_related("course_registration_periods"),
+                CourseRegistration.objects,
                 EventRegistration.objects,
                 OrderableRegistration.objects,
             )
         ):
-            status = reg.get_payment_status(context["date"])
+            status = reg.get_payment_status(cleaned_data["date"])
             if status.amount_due:
-                report = context["reports"].setdefault(reg.user, self.Report())
-                report.append(self.ReportItem(registration=reg, status=status))
-        context["sum"] = sum(report.sum for report in context["reports"].values())
-
-        return TemplateResponse(self.request, self.template_name, self.get_context_data(**context))
+                report = reports.setdefault(reg.user, Report())
+                report.append(ReportItem(registration=reg, status=status))
+        return {
+            "reports": reports,
+            "sum": sum(report.sum for report in reports.values()),
+        }
@@ -0,0 +1,52 @@
+from collections import defaultdict, namedtuple
+
+from ...models.activities import Activity, Registration
+from .runner import ReportView
+
+RegPaymentStatus = namedtuple("RegPaymentStatus", ("registration", "status"))
+ActivityPaymentsStatus = namedtuple("ActivityPaymentsStatus", ("activity", "registration_statuses", "status"))
+PaymentsStatusSum = namedtuple("PaymentsStatusSum", ("registrations", "status"))
+
+
+class ReportPaymentsStatusView(ReportView):
+    """
+    Common base of course, event and orderable payments status reports
+    """
+
+    activity_model: type[Activity]
+    registration_model: type[Registration]
+
+    def get_report_data(self, cleaned_data):
+        d = cleaned_data["date"]
+        activities = self.activity_model.objects.filter(school_year=self.request.school_year).prefetch_related(
+            "variants__school_year_division"
+        )
+        # all the registrations are loaded with the data needed to compute their payment status at once
+        registrations_by_activity = defaultdict(list)
+        for registration in (
+            self.registration_model.objects.filter(
+                activity__school_year=self.request.school_year,
+                approved__date__lte=d,
+            )
+            .with_payment_status_data()
+            .select_related("activity__school_year", "group")
+            .prefetch_related("participants")
+        ):
+            registration_status = RegPaymentStatus(registration=registration, status=registration.get_payment_status(d))
+            if registration_status.status.receivable:
+                registrations_by_activity[registration.activity_id].append(registration_status)
+        reports = [
+            ActivityPaymentsStatus(
+                activity=activity,
+                registration_statuses=registrations_by_activity[activity.id],
+                status=sum(rs.status for rs in registrations_by_activity[activity.id]),
+            )
+            for activity in activities
+        ]
+        return {
+            "reports": reports,
+            "sum": PaymentsStatusSum(
+                registrations=sum(len(report.registration_statuses) for report in reports),
+                status=sum(report.status for report in reports),
+            ),
+        }
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import logging
+from contextvars import copy_context
+from threading import Event, Thread
+from time import monotonic
+
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponseRedirect, QueryDict
+from django.template.response import TemplateResponse
+from django.urls import reverse_lazy as reverse
+from django.utils.translation import gettext_lazy as _
+
+from ...conf import settings
+from ...models.activities import get_report_data_version
+from ...models.leprikonsite import site_defaults_scope
+from ...utils.metrics import REPORT_SECONDS
+from ...views.generic import FormView
+
+logger = logging.getLogger(__name__)
+
+REPORT_PARAM = "report"
+
+
+def get_running_timeout() -> int:
+    # the running marker is refreshed every refresh interval and expires soon after the process dies
+    return settings.LEPRIKON_REPORT_REFRESH_INTERVAL * 3
+
+
+class ReportView(FormView):
+    """
+    Base of all reports.
+
+    The result of get_report_data is cached by the report type, its parameters and the data version,
+    so that identical requests are served from the cache until any data changes.
+    With LEPRIKON_REPORT_ASYNC, the report is computed in a background thread,
+    while the user is shown a page refreshing until the result is ready.
+    """
+
+    submit_label = _("Show")
+    back_url = reverse("leprikon:report_list")
+    computing_template_name = "leprikon/reports/computing.html"
+
+    def get_report_data(self, cleaned_data) -> dict:
+        raise NotImplementedError()
+
+    def compute_report_data(self, cleaned_data) -> dict:
+        with REPORT_SECONDS.time(report=f"{type(self).__module__}.{type(self).__qualname__}"):
+            return self.get_report_data(cleaned_data)
+
+    def render_report(self, form, report_data):
+        context = dict(form.cleaned_data, form=form, **report_data)
+        return TemplateResponse(self.request, self.template_name, self.get_context_data(**context))
+
+    def get_report_params(self, form) -> dict[str, list[str]]:
+        return {form.add_prefix(name): form.data.getlist(form.add_prefix(name)) for name in form.fields}
+
+    def get_report_key(self, params) -> str:
+        return hashlib.sha1(
+            json.dumps(
+                [
+                    f"{type(self).__module__}.{type(self).__qualname__}",
+                    self.request.school_year.id,
+                    sorted(params.items()),
+                    get_report_data_version(),
+                ]
+            ).encode()
+        ).hexdigest()
+
+    def form_valid(self, form):
+        params = self.get_report_params(form)
+        key = self.get_report_key(params)
+        report_data = cache.get(f"leprikon:report:{key}")
+        if report_data is None:
+            if not settings.LEPRIKON_REPORT_ASYNC:
+                report_data = self.compute_report_data(form.cleaned_data)
+                cache.set(f"leprikon:report:{key}", report_data, settings.LEPRIKON_REPORT_CACHE_TIMEOUT)
+                return self.render_report(form, report_data)
+            cache.set(f"leprikon:report:{key}:params", params, settings.LEPRIKON_REPORT_CACHE_TIMEOUT)
+            if cache.add(f"leprikon:report:{key}:running", True, get_running_timeout()):
+                # the report is computed with the context (e.g. language) of the request
+                Thread(target=copy_context().run, args=(self.run_report, key, form.cleaned_data), daemon=True).start()
+            return HttpResponseRedirect(f"{self.request.path}?{REPORT_PARAM}={key}")
+        return self.render_report(form, report_data)
+
+    def keep_running(self, key, done: Event):
+        deadline = monotonic() + settings.LEPRIKON_REPORT_TIMEOUT
+        while not done.wait(settings.LEPRIKON_REPORT_REFRESH_INTERVAL) and monotonic() < deadline:
+            cache.touch(f"leprikon:report:{key}:running", get_running_timeout())
+
+    def run_report(self, key, cleaned_data):
+        done = Event()
+        Thread(target=self.keep_running, args=(key, done), daemon=True).start()
+        try:
+            with site_defaults_scope():
+                report_data = self.compute_report_data(cleaned_data)
+            cache.set(f"leprikon:report:{key}", report_data, settings.LEPRIKON_REPORT_CACHE_TIMEOUT)
+        except Exception:
+            logger.exception("Failed to compute report %s", key)
+            cache.set(f"leprikon:report:{key}:failed", True, settings.LEPRIKON_REPORT_TIMEOUT)
+        finally:
+            done.set()
+            cache.delete(f"leprikon:report:{key}:running")
+            connection.close()
+
+    def get(self, request, *args, **kwargs):
+        key = request.GET.get(REPORT_PARAM)
+        params = key and cache.get(f"leprikon:report:{key}:params")
+        if not params:
+            return super().get(request, *args, **kwargs)
+        data = QueryDict(mutable=True)
+        for name, values in params.items():
+            data.setlist(name, values)
+        form = self.get_form_class()(**dict(self.get_form_kwargs(), data=data))
+        if not form.is_valid():
+            return self.form_invalid(form)
+        report_data = cache.get(f"leprikon:report:{key}")
+        if report_data is not None:
+            return self.render_report(form, report_data)
+        if cache.get(f"leprikon:report:{key}:running"):
+            return TemplateResponse(
+                request,
+                self.computing_template_name,
+                self.get_context_data(form=form, refresh_interval=settings.LEPRIKON_REPORT_REFRESH_INTERVAL),
+            )
+        if cache.get(f"leprikon:report:{key}:failed"):
+            messages.error(request, _("Failed to compute the report. Please, try again later."))
+            return self.form_invalid(form)
+        # the result has expired in the meantime
+        return self.form_valid(form)
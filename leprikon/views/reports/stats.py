@@ -0,0 +1,171 @@
+import csv
+from collections import Counter, namedtuple
+
+from django.db.models import Count, Max, QuerySet
+from django.db.models.functions import Lower
+from django.http import HttpResponse
+from django.utils.text import slugify
+from django.utils.translation import gettext_lazy as _
+
+from ...models.activities import Registration, RegistrationParticipant
+from ...models.citizenship import Citizenship
+from ...models.roles import Participant
+from ...models.statgroup import StatGroup
+from ...models.utils import PaymentStatus
+from .runner import ReportView
+
+StatsItem = namedtuple("StatsItem", ("stat_group", "all", "boys", "girls", "citizenships"))
+ParticipantStats = namedtuple("ParticipantStats", ("activities_count", "citizenships", "total", "by_stat_groups"))
+
+TOTAL = "total"
+ALL = "all"
+PERSON_KEY_FIELDS = ("first_name_key", "last_name_key", "birth_date")
+
+
+def with_person_key(participants: QuerySet) -> QuerySet:
+    # the same person registered several times is identified by the names and the birth date
+    return participants.annotate(first_name_key=Lower("first_name"), last_name_key=Lower("last_name"))
+
+
+def get_unique_participants(participants: QuerySet) -> QuerySet:
+    """
+    Keep only one (the last) participant of each person.
+    """
+    return RegistrationParticipant.objects.filter(
+        id__in=with_person_key(participants.order_by())
+        .values(*PERSON_KEY_FIELDS)
+        .annotate(last_id=Max("id"))
+        .values("last_id")
+    )
+
+
+def get_participant_stats(
+    participants: QuerySet, activities_count: int, unique_participants: bool = False
+) -> ParticipantStats:
+    """
+    Cross-tabulate participants by stat groups, genders and citizenships using grouped queries.
+    With unique_participants, each person is only counted once (in the stat group and citizenship of the last
+    participant), so that the rows add up to the total.
+    """
+    if unique_participants:
+        participants = get_unique_participants(participants)
+    participants = participants.order_by()
+    count = Count("id")
+    counts = Counter()
+    for stat_group_field in (None, "age_group__stat_group_id"):
+        for category_field in (None, "gender", "citizenship_id"):
+            fields = [field for field in (stat_group_field, category_field) if field]
+            rows = (
+                participants.values(*fields).annotate(count=count) if fields else [participants.aggregate(count=count)]
+            )
+            for row in rows:
+                stat_group_id = row[stat_group_field] if stat_group_field else TOTAL
+                category = row[category_field] if category_field else ALL
+                counts[stat_group_id, category] += row["count"]
+
+    citizenships = list(Citizenship.objects.all())
+
+    def get_stats_item(stat_group):
+        stat_group_id = stat_group.id if stat_group else TOTAL
+        return StatsItem(
+            stat_group=stat_group,
+            all=counts[stat_group_id, ALL],
+            boys=counts[stat_group_id, Participant.MALE],
+            girls=counts[stat_group_id, Participant.FEMALE],
+            citizenships=[counts[stat_group_id, citizenship.id] for citizenship in citizenships],
+        )
+
+    return ParticipantStats(
+        activities_count=activities_count,
+        citizenships=citizenships,
+        total=get_stats_item(None),
+        by_stat_groups=[get_stats_item(stat_group) for stat_group in StatGroup.objects.all()],
+    )
+
+
+class ReportStatsView(ReportView):
+    """
+    Common base of course, event and orderable statistics reports
+    """
+
+    activities_field: str
+    activities_count_name: str
+    registration_model: type[Registration]
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["school_year"] = self.request.school_year
+        return kwargs
+
+    def get_activities(self, cleaned_data):
+        return cleaned_data[self.activities_field]
+
+    def is_paid(self, payment_status: PaymentStatus) -> bool:
+        return payment_status.balance >= 0
+
+    def get_participants(self, cleaned_data, report_data) -> QuerySet:
+        d = cleaned_data["date"]
+        if cleaned_data["approved_later"]:
+            # approved registrations created by the date
+            participants = RegistrationParticipant.objects.filter(
+                registration__created__date__lte=d,
+                registration__approved__isnull=False,
+            )
+        else:
+            # registrations approved by the date
+            participants = RegistrationParticipant.objects.filter(
+                registration__approved__date__lte=d,
+            )
+        participants = participants.filter(
+            registration__activity__in=self.get_activities(cleaned_data),
+        ).exclude(registration__canceled__date__lte=d)
+        if cleaned_data["paid_only"]:
+            paid_date = None if cleaned_data["paid_later"] else d
+            registrations = self.registration_model.objects.filter(
+                id__in=participants.values("registration_id"),
+            ).with_payment_status_data()
+            participants = participants.filter(
+                registration_id__in=[
+                    registration.id
+                    for registration in registrations
+                    if self.is_paid(registration.get_payment_status(paid_date))
+                ]
+            )
+        return participants
+
+    def filter_participants(self, participants: QuerySet, cleaned_data, report_data) -> QuerySet:
+        # additional filters, which do not affect the number of activities
+        return participants
+
+    def is_unique(self, cleaned_data) -> bool:
+        return cleaned_data["unique_participants"]
+
+    def get_report_data(self, cleaned_data):
+        report_data = {}
+        participants = self.get_participants(cleaned_data, report_data)
+        activities_count = participants.order_by().values("registration__activity_id").distinct().count()
+        participants = self.filter_participants(participants, cleaned_data, report_data)
+        report_data["stats"] = get_participant_stats(participants, activities_count, self.is_unique(cleaned_data))
+        return report_data
+
+    def render_report(self, form, report_data):
+        stats = report_data["stats"]
+        if form.cleaned_data["csv"]:
+            return self.get_csv_response(stats)
+        report_data = dict(report_data)
+        report_data[self.activities_count_name] = stats.activities_count
+        report_data["citizenships"] = stats.citizenships
+        report_data["participants_counts"] = stats.total
+        report_data["participants_counts_by_stat_groups"] = stats.by_stat_groups
+        return super().render_report(form, report_data)
+
+    def get_csv_response(self, stats: ParticipantStats):
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="{}.csv"'.format(slugify(self.title))
+        writer = csv.writer(response)
+        writer.writerow([_("Age Group"), _("Registrations"), _("Boys"), _("Girls"), *stats.citizenships])
+        for item in stats.by_stat_groups:
+            writer.writerow([item.stat_group.title(), item.all, item.boys, item.girls, *item.citizenships])
+        item = stats.total
+        writer.writerow([_("Total"), item.all, item.boys, item.girls, *item.citizenships])
+        return response
@@ -19,10 +19,11 @@ class SummaryView(TemplateView):
         for Registration in (CourseRegistration, EventRegistration, OrderableRegistration):
             for registration in (
                 Registration.objects.filter(user=self.request.user)
+                .with_payment_status_data()
+                .prefetch_related("participants", "group", "refund_request")
                 .annotate(
                     refund_bank_account=F("refund_request__bank_account"),
                 )
-                .iterator()
             ):
                 payment_status += registration.payment_status
                 if registration.payment_status.overpaid:
@@ -0,0 +1,23 @@
+import pytest
+
+from leprikon.models.activities import Activity, ActivityModel, ActivityVariant
+from leprikon.models.courses import Course
+
+
+@pytest.mark.django_db
+def test_hold_requires_orderable(client, school_year, user, activity_type):
+    course = Course.objects.create(
+        school_year=school_year,
+        activity_type=activity_type(ActivityModel.COURSE),
+        registration_type=Activity.PARTICIPANTS,
+        name="C",
+        public=True,
+    )
+    activity_variant = ActivityVariant.objects.create(activity=course)
+    client.force_login(user)
+    response = client.post(
+        f"/api/activity/{activity_variant.id}/hold",
+        {"start_date": "2020-10-01", "start_time": "10:00"},
+        content_type="application/json",
+    )
+    assert response.status_code == 404
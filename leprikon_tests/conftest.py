@@ -2,6 +2,10 @@ from locale import LC_ALL, setlocale
 from typing import Generator
 
 import pytest
+from django.contrib.auth import get_user_model
+
+from leprikon.models.activities import ActivityType
+from leprikon.models.schoolyear import SchoolYear
 
 
 @pytest.fixture
@@ -10,3 +14,21 @@ def locale_cs_CZ() -> Generator[None, None, None]:
     setlocale(LC_ALL, "cs_CZ.utf8")
     yield
     setlocale(LC_ALL, prev_locale)
+
+
+@pytest.fixture
+def school_year(db) -> SchoolYear:
+    return SchoolYear.objects.create(year=2020, active=True)
+
+
+@pytest.fixture
+def user(db):
+    return get_user_model().objects.create(username="user", email="user@example.com")
+
+
+@pytest.fixture
+def activity_type(db):
+    def activity_type(model: str) -> ActivityType:
+        return ActivityType.objects.create(model=model, name=model, plural=model, slug=model)
+
+    return activity_type
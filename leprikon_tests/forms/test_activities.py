@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from leprikon.forms.activities import CourseRegistrationForm
+from leprikon.models.activities import Activity, ActivityModel, ActivityVariant
+from leprikon.models.courses import Course, CourseRegistration
+from leprikon.models.schoolyear import SchoolYearDivision, SchoolYearPeriod
+from leprikon.models.statgroup import StatGroup
+from leprikon.models.targetgroup import TargetGroup
+
+
+@pytest.mark.django_db
+def test_course_registration_cached_balance(school_year, user, activity_type):
+    school_year_division = SchoolYearDivision.objects.create(
+        school_year=school_year, name="semesters", price_unit_name="semester"
+    )
+    for name, price_units_count in (("first", 1), ("second", 2)):
+        SchoolYearPeriod.objects.create(
+            school_year_division=school_year_division,
+            name=name,
+            price_units_count=price_units_count,
+            due_from=date.today(),
+            due_date=date.today() + timedelta(days=14),
+        )
+    target_group = TargetGroup.objects.create(
+        name="adults", require_school=False, stat_group=StatGroup.objects.create(name="adults")
+    )
+    course = Course.objects.create(
+        school_year=school_year,
+        activity_type=activity_type(ActivityModel.COURSE),
+        registration_type=Activity.GROUPS,
+        name="Course",
+    )
+    course.target_groups.add(target_group)
+    activity_variant = ActivityVariant.objects.create(
+        activity=course,
+        registration_price=Decimal(1000),
+        school_year_division=school_year_division,
+    )
+
+    form = CourseRegistrationForm(
+        activity=course,
+        activity_variant=activity_variant,
+        user=user,
+        instance=None,
+        data={
+            "participants_count": "1",
+            "billing_info_select-billing_info": "none",
+            "group-TOTAL_FORMS": "1",
+            "group-INITIAL_FORMS": "0",
+            "group-MIN_NUM_FORMS": "1",
+            "group-MAX_NUM_FORMS": "1",
+            "group-0-group_contact_select-group_contact": "new",
+            "group-0-target_group": str(target_group.id),
+            "group-0-first_name": "Jan",
+            "group-0-last_name": "Novák",
+            "group-0-street": "Hlavní 1",
+            "group-0-city": "Praha",
+            "group-0-postal_code": "110 00",
+            "group-0-phone": "123456789",
+            "group-0-email": "jan.novak@example.com",
+        },
+    )
+    assert form.is_valid(), form.errors
+    registration = CourseRegistration.objects.get(id=form.save().id)
+    assert registration.cached_balance == Decimal(-3000)
+    assert registration.cached_balance == registration.get_payment_status().balance
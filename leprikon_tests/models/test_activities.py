@@ -0,0 +1,154 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from leprikon.conf import settings
+from leprikon.models.activities import (
+    ORDERABLE_HOLDS_SEQUENCE_KEY,
+    Activity,
+    ActivityModel,
+    ActivityVariant,
+    Registration,
+    RegistrationParticipant,
+    add_orderable_hold,
+    get_orderable_holds,
+)
+from leprikon.models.calendar import CalendarEvent
+from leprikon.models.courses import Course, CourseRegistration, CourseRegistrationPeriod
+from leprikon.models.events import Event, EventRegistration
+from leprikon.models.orderables import Orderable, OrderableRegistration
+from leprikon.models.schoolyear import SchoolYearDivision, SchoolYearPeriod
+from leprikon.models.transaction import Transaction
+from leprikon.utils.calendar import SimpleEvent, TimeSlot
+
+
+@pytest.mark.parametrize(
+    "birth_num, first_name, last_name, identity_key",
+    (
+        ("123456/7890", "Jan", "Novák", "1234567890"),
+        (None, "Jan", "Novák", "2015-03-01:jan:novák"),
+        ("", " Jan ", "NOVÁK", "2015-03-01:jan:novák"),
+    ),
+)
+def test_participant_identity_key(birth_num: str, first_name: str, last_name: str, identity_key: str):
+    participant = RegistrationParticipant(
+        birth_num=birth_num,
+        birth_date=date(2015, 3, 1),
+        first_name=first_name,
+        last_name=last_name,
+    )
+    assert participant.get_identity_key() == identity_key
+
+
+@pytest.mark.django_db
+def test_participant_presences_prefetched(django_assert_num_queries):
+    participants = [RegistrationParticipant(id=participant_id) for participant_id in (1, 2, 3)]
+    with django_assert_num_queries(1):
+        RegistrationParticipant.prefetch_presences(participants)
+        for participant in participants:
+            assert participant.presences == []
+            assert participant.attendance_stats.entries_count == 0
+
+
+@pytest.mark.django_db
+def test_not_paid_matches_payment_status(school_year, user, activity_type):
+    today = date.today()
+    payment_requested = timezone.now()
+    registrations = []
+
+    def create_registration(registration_model, activity, requested=True, **kwargs):
+        registration = registration_model.objects.create(
+            user=user,
+            activity=activity,
+            activity_variant=ActivityVariant.objects.create(activity=activity, registration_price=Decimal(1000)),
+            participants_count=1,
+            price=Decimal(1000),
+            payment_requested=payment_requested if requested else None,
+            **kwargs,
+        )
+        registrations.append(registration)
+        return registration
+
+    school_year_division = SchoolYearDivision.objects.create(
+        school_year=school_year, name="semesters", price_unit_name="semester"
+    )
+    course = Course.objects.create(
+        school_year=school_year,
+        activity_type=activity_type(ActivityModel.COURSE),
+        registration_type=Activity.GROUPS,
+        name="C",
+    )
+    for requested in (True, False):
+        course_registration = create_registration(CourseRegistration, course, requested)
+        for due_from, price_units_count in ((today - timedelta(days=1), 1), (today + timedelta(days=30), 2)):
+            CourseRegistrationPeriod.objects.create(
+                registration=course_registration,
+                period=SchoolYearPeriod.objects.create(
+                    school_year_division=school_year_division,
+                    name=str(due_from),
+                    price_units_count=price_units_count,
+                    due_from=due_from,
+                    due_date=due_from + timedelta(days=14),
+                ),
+            )
+
+    event_type = activity_type(ActivityModel.EVENT)
+    for due_from in (today - timedelta(days=1), today + timedelta(days=1)):
+        event = Event.objects.create(
+            school_year=school_year,
+            activity_type=event_type,
+            registration_type=Activity.GROUPS,
+            name="E",
+            start_date=today + timedelta(days=7),
+            end_date=today + timedelta(days=7),
+            due_from=due_from,
+            due_date=due_from + timedelta(days=3),
+        )
+        create_registration(EventRegistration, event)
+
+    orderable_type = activity_type(ActivityModel.ORDERABLE)
+    for due_from_days in (None, 3, 30):
+        orderable = Orderable.objects.create(
+            school_year=school_year,
+            activity_type=orderable_type,
+            registration_type=Activity.GROUPS,
+            name="O",
+            duration=timedelta(hours=1),
+            due_from_days=due_from_days,
+        )
+        calendar_event = CalendarEvent.objects.create(
+            name="O", activity=orderable, start_date=today + timedelta(days=7), end_date=today + timedelta(days=7)
+        )
+        create_registration(OrderableRegistration, orderable, calendar_event=calendar_event)
+
+    # partially paid registration
+    Transaction.objects.create(
+        target_registration=registrations[0],
+        transaction_type=Transaction.PAYMENT_CASH,
+        amount=Decimal(400),
+    )
+
+    amounts_due = dict(Registration.objects.with_amount_due().values_list("id", "amount_due"))
+    not_paid = set(Registration.objects.not_paid().values_list("id", flat=True))
+    for registration in registrations:
+        registration = type(registration).objects.get(id=registration.id)
+        amount_due = registration.get_payment_status().amount_due
+        assert amounts_due[registration.id] == amount_due
+        assert (registration.id in not_paid) == (amount_due > 0)
+    assert not_paid
+
+
+def test_orderable_holds(monkeypatch):
+    monkeypatch.setattr(settings, "LEPRIKON_ORDERABLE_HOLD_TIMEOUT", 60)
+    cache.delete(ORDERABLE_HOLDS_SEQUENCE_KEY)
+    start = timezone.now()
+    events = [SimpleEvent(TimeSlot(start=start, end=start + timedelta(hours=hours)), [{1}]) for hours in (1, 2, 3)]
+    add_orderable_hold(1, events[0])
+    add_orderable_hold(2, events[1])
+    add_orderable_hold(1, events[2])
+    assert get_orderable_holds() == {1: events[2], 2: events[1]}
+    add_orderable_hold(1, None)
+    assert get_orderable_holds() == {2: events[1]}
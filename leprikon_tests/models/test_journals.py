@@ -0,0 +1,84 @@
+from datetime import date
+
+import pytest
+
+from leprikon.models.activities import Activity, ActivityModel, ActivityVariant, RegistrationParticipant
+from leprikon.models.agegroup import AgeGroup
+from leprikon.models.citizenship import Citizenship
+from leprikon.models.courses import Course, CourseRegistration
+from leprikon.models.journals import AttendanceStats, Journal, JournalEntry, get_attendance_stats
+from leprikon.models.statgroup import StatGroup
+
+
+@pytest.mark.parametrize(
+    "presences, expected_stats",
+    (
+        ([], AttendanceStats(0, 0, 0, 0)),
+        ([True, True, True], AttendanceStats(3, 3, 0, 0)),
+        ([False, False, True, False], AttendanceStats(4, 1, 2, 1)),
+        ([True, False, True, False, False, False], AttendanceStats(6, 2, 3, 3)),
+    ),
+)
+def test_attendance_stats_from_presences(presences: list[bool], expected_stats: AttendanceStats):
+    stats = AttendanceStats.from_presences(presences)
+    assert stats == expected_stats
+    assert stats.absences_count == len(presences) - sum(presences)
+
+
+def test_attendance_stats_presence_ratio():
+    assert AttendanceStats(0, 0, 0, 0).presence_ratio is None
+    assert AttendanceStats(4, 3, 1, 0).presence_ratio == 0.75
+
+
+@pytest.mark.django_db
+def test_attendance_stats(school_year, user, activity_type):
+    course = Course.objects.create(
+        school_year=school_year,
+        activity_type=activity_type(ActivityModel.COURSE),
+        registration_type=Activity.PARTICIPANTS,
+        name="C",
+    )
+    registration = CourseRegistration.objects.create(
+        user=user,
+        activity=course,
+        activity_variant=ActivityVariant.objects.create(activity=course),
+        participants_count=2,
+    )
+    age_group = AgeGroup.objects.create(name="children", stat_group=StatGroup.objects.create(name="children"))
+    citizenship = Citizenship.objects.create(name="Czech")
+    participants = [
+        RegistrationParticipant.objects.create(
+            registration=registration,
+            first_name=first_name,
+            last_name="Novák",
+            citizenship=citizenship,
+            birth_date=date(2015, 3, 1),
+            age_group=age_group,
+            street="Street",
+            city="City",
+            postal_code="12345",
+        )
+        for first_name in ("Jan", "Petr")
+    ]
+    journal = Journal.objects.create(activity=course)
+    other_journal = Journal.objects.create(activity=course)
+    journal.participants.set(participants)
+    other_journal.participants.set(participants[:1])
+    for day, present in enumerate(([0, 1], [], [1], [], [])):
+        entry = JournalEntry.objects.create(journal=journal, date=date(2020, 10, day + 1))
+        entry.participants.set(participants[i] for i in present)
+    JournalEntry.objects.create(journal=other_journal, date=date(2020, 10, 1)).participants.set(participants[:1])
+
+    participants_qs = RegistrationParticipant.objects.filter(registration=registration)
+    assert get_attendance_stats(participants_qs) == {
+        participants[0].id: AttendanceStats(6, 2, 4, 4),
+        participants[1].id: AttendanceStats(5, 2, 2, 2),
+    }
+    assert get_attendance_stats(participants_qs, journals=[other_journal]) == {
+        participants[0].id: AttendanceStats(1, 1, 0, 0),
+        participants[1].id: AttendanceStats(0, 0, 0, 0),
+    }
+    assert participants_qs.attendance_totals(Journal.objects.filter(activity=course)) == {
+        "journal_entries_count": 11,
+        "presences_count": 4,
+    }
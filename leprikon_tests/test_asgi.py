@@ -0,0 +1,72 @@
+import asyncio
+from functools import wraps
+from threading import Event, current_thread
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+
+from leprikon.api.asgi import is_calendar_path
+from leprikon.api.views import CalendarExportViewSet
+from leprikon.site.asgi import application
+
+
+@pytest.mark.parametrize(
+    "path, calendar",
+    (
+        ("/api/activity/1/unavailable_dates", True),
+        ("/api/activity/1/business_hours", True),
+        ("/api/calendarexport/1/ical", True),
+        ("/api/activity/1", False),
+        ("/api/calendarexport/1/ical/", False),
+        ("/courses/", False),
+    ),
+)
+def test_is_calendar_path(path: str, calendar: bool):
+    assert is_calendar_path(path) == calendar
+
+
+@pytest.mark.django_db(transaction=True)
+def test_calendar_request_does_not_block_other_requests(monkeypatch):
+    started = Event()
+    release = Event()
+    view_threads = []
+
+    @wraps(CalendarExportViewSet.ical)
+    def ical(self, request, pk):
+        view_threads.append(current_thread().name)
+        started.set()
+        release.wait(10)
+        return HttpResponse("calendar")
+
+    monkeypatch.setattr(CalendarExportViewSet, "ical", ical)
+
+    async def run():
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/calendarexport/1/ical",
+            "query_string": b"",
+            "headers": [],
+        }
+        calendar_request = asyncio.ensure_future(application(scope, receive, send))
+        assert await asyncio.get_running_loop().run_in_executor(None, started.wait, 10)
+        # the thread running the sync code of all the other requests is not blocked by the pending calendar request
+        await asyncio.wait_for(sync_to_async(lambda: None, thread_sensitive=True)(), 1)
+        assert not calendar_request.done()
+        release.set()
+        await calendar_request
+        return messages
+
+    messages = asyncio.run(run())
+    assert messages[0]["status"] == 200
+    assert messages[1]["body"] == b"calendar"
+    assert view_threads[0].startswith("leprikon-api")
@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+LAZY_MODULES = ("segno", "trml2pdf", "pypdf", "icalendar", "django_excel", "pyexcel")
+
+STARTUP = "import django; django.setup(); import leprikon.admin, leprikon.site.urls"
+
+
+@pytest.fixture(scope="module")
+def imported_modules() -> set[str]:
+    # python -X importtime reports every imported module on stderr as "import time: self | cumulative | name"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP],
+        capture_output=True,
+        check=True,
+        env={**os.environ, "DJANGO_SETTINGS_MODULE": "leprikon.site.settings"},
+        text=True,
+    )
+    return {line.rsplit("|", 1)[1].strip() for line in result.stderr.splitlines() if line.startswith("import time:")}
+
+
+@pytest.mark.parametrize("module", LAZY_MODULES)
+def test_startup_does_not_import(imported_modules: set[str], module: str):
+    assert not any(name == module or name.startswith(f"{module}.") for name in imported_modules)
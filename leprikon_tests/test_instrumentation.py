@@ -0,0 +1,15 @@
+import pytest
+
+from leprikon.utils.instrumentation import normalize_sql
+
+
+@pytest.mark.parametrize(
+    "sql, normalized",
+    (
+        ('SELECT "id"\n  FROM "t"  WHERE "id" = %s', 'SELECT "id" FROM "t" WHERE "id" = %s'),
+        ('SELECT * FROM "t" WHERE "id" IN (%s, %s, %s)', 'SELECT * FROM "t" WHERE "id" IN (...)'),
+        ('SELECT * FROM "t" WHERE "id" IN (%s,%s)', 'SELECT * FROM "t" WHERE "id" IN (...)'),
+    ),
+)
+def test_normalize_sql(sql: str, normalized: str):
+    assert normalize_sql(sql) == normalized
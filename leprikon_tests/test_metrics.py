@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from leprikon.utils.metrics import Counter, Histogram, Registry, settings
+
+
+@pytest.mark.parametrize("metrics_dir", (False, True))
+def test_metrics_render(monkeypatch, tmp_path, metrics_dir: bool):
+    monkeypatch.setattr(settings, "LEPRIKON_METRICS", True)
+    monkeypatch.setattr(settings, "LEPRIKON_METRICS_DIR", str(tmp_path) if metrics_dir else None)
+    registry = Registry()
+    counter = Counter("test_events", "Test events.", ("kind",), registry=registry)
+    histogram = Histogram("test_seconds", "Test durations.", buckets=(0.1, 1), registry=registry)
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+    histogram.observe(0.5)
+    assert registry.render() == "\n".join(
+        [
+            "# HELP test_events Test events.",
+            "# TYPE test_events counter",
+            'test_events_total{kind="a"} 3.0',
+            "# HELP test_seconds Test durations.",
+            "# TYPE test_seconds histogram",
+            'test_seconds_bucket{le="0.1"} 0.0',
+            'test_seconds_bucket{le="1.0"} 1.0',
+            'test_seconds_bucket{le="+Inf"} 1.0',
+            "test_seconds_count 1.0",
+            "test_seconds_sum 0.5",
+            "",
+        ]
+    )
+
+
+def test_metrics_written_in_batches(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "LEPRIKON_METRICS", True)
+    monkeypatch.setattr(settings, "LEPRIKON_METRICS_DIR", str(tmp_path))
+    registry = Registry()
+    counter = Counter("test_events", "Test events.", registry=registry)
+    counter.inc()
+    counter.inc()
+    (filename,) = tmp_path.glob("*.json")
+    assert filename.read_text() == '[["test_events:total", [], 1.0]]'
+    assert registry.collect() == {("test_events:total", ()): 2.0}
+
+
+def test_metrics_of_finished_processes_archived(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "LEPRIKON_METRICS", True)
+    monkeypatch.setattr(settings, "LEPRIKON_METRICS_DIR", str(tmp_path))
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    for i in range(2):
+        (tmp_path / f"{process.pid}-{i}.json").write_text('[["test_events:total", [], 1.0]]')
+    registry = Registry()
+    Counter("test_events", "Test events.", registry=registry).inc()
+    assert registry.collect() == {("test_events:total", ()): 3.0}
+    assert sorted(path.name for path in tmp_path.glob("*.json")) == sorted(
+        ["archive.json", os.path.basename(registry.filename)]
+    )
+    assert registry.collect() == {("test_events:total", ()): 3.0}
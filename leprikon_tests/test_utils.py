@@ -0,0 +1,39 @@
+import time
+
+import pytest
+
+from leprikon.utils import admission_slot
+
+
+@pytest.fixture
+def clock(monkeypatch) -> list[float]:
+    now = [time.time()]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+def test_admission_slot_limit(clock: list[float]):
+    with admission_slot("test:admission_limit", 2, 60) as first:
+        with admission_slot("test:admission_limit", 2, 60) as second:
+            # the slots are kept until the timeout, even if more requests come
+            clock[0] += 59
+            with admission_slot("test:admission_limit", 2, 60) as third:
+                assert (first, second, third) == (True, True, False)
+    with admission_slot("test:admission_limit", 2, 60) as fourth:
+        assert fourth
+
+
+def test_admission_slot_limit_after_expiration(clock: list[float]):
+    first = admission_slot("test:admission_expiration", 1, 60)
+    assert first.__enter__()
+    # the slot of a request running longer than the timeout is released
+    clock[0] += 61
+    second = admission_slot("test:admission_expiration", 1, 60)
+    assert second.__enter__()
+    # the finished first request does not release the slot taken by the second one
+    first.__exit__(None, None, None)
+    with admission_slot("test:admission_expiration", 1, 60) as third:
+        assert not third
+    second.__exit__(None, None, None)
+    with admission_slot("test:admission_expiration", 1, 60) as fourth:
+        assert fourth
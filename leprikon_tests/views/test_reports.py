@@ -0,0 +1,39 @@
+import csv
+
+import pytest
+
+from leprikon.models.activities import Activity, ActivityModel, get_report_data_version
+from leprikon.models.citizenship import Citizenship
+from leprikon.models.courses import Course
+from leprikon.models.journals import Journal
+from leprikon.models.statgroup import StatGroup
+from leprikon.views.reports.courses import ReportCourseStatsView
+from leprikon.views.reports.stats import ParticipantStats, StatsItem
+
+
+def test_stats_csv():
+    stats = ParticipantStats(
+        activities_count=2,
+        citizenships=[Citizenship(name="Czech")],
+        total=StatsItem(stat_group=None, all=3, boys=1, girls=2, citizenships=[3]),
+        by_stat_groups=[StatsItem(stat_group=StatGroup(name="children"), all=3, boys=1, girls=2, citizenships=[3])],
+    )
+    response = ReportCourseStatsView().get_csv_response(stats)
+    rows = list(csv.reader(response.content.decode().splitlines()))
+    assert rows[1] == ["Children", "3", "1", "2", "3"]
+    assert rows[2][1:] == ["3", "1", "2", "3"]
+
+
+@pytest.mark.django_db
+def test_report_data_version(school_year, activity_type):
+    version = get_report_data_version()
+    course = Course.objects.create(
+        school_year=school_year,
+        activity_type=activity_type(ActivityModel.COURSE),
+        registration_type=Activity.PARTICIPANTS,
+        name="C",
+    )
+    Citizenship.objects.create(name="Czech")
+    assert get_report_data_version() == version
+    Journal.objects.create(activity=course)
+    assert get_report_data_version() != version